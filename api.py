@@ -0,0 +1,26 @@
+"""Serveur de l'API de données en lecture seule (voir ``utils.api``).
+
+Exemple :
+
+    python api.py --port 8502 --workers 2
+    curl -H "Accept-Encoding: gzip" "http://localhost:8502/cantons/potentials?dataset=total"
+"""
+import argparse
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sert l'API de données du dashboard.")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8502, help="Port d'écoute")
+    parser.add_argument("--workers", type=int, default=1, help="Processus uvicorn")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    uvicorn.run("utils.api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
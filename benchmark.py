@@ -0,0 +1,353 @@
+"""Mesures de performance des pages et des étapes coûteuses du dashboard.
+
+Chaque page de ``pages/`` est exécutée sans navigateur (``AppTest`` de
+Streamlit), à froid (caches vidés) puis à chaud. Les étapes sensibles sont
+aussi mesurées isolément : chargement des données, construction de la carte
+des entreprises et taille du HTML, ancienne boucle ``iterrows`` de
+marqueurs, ``gdf.to_json()`` face au TopoJSON simplifié, résolution d'un clic.
+Les mesures portent sur les données réelles et sur des registres
+d'entreprises synthétiques 10× et 100× plus grands.
+
+``--cold-start`` mesure aussi le temps jusqu'à la première carte après un
+redémarrage : chaque page est exécutée dans un interpréteur neuf (Streamlit
+déjà importé, comme dans un serveur), sans puis avec préchauffage du processus
+(``utils.warmup``), et comparée à l'objectif ``FIRST_MAP_TARGET_S``.
+
+Les mesures à froid partent d'un store Feather vide (``utils.store``, placé
+dans un répertoire temporaire pendant le benchmark) : elles comprennent la
+lecture des CSV. ``load_companies_store`` mesure la relecture depuis le store.
+
+Les résultats sont écrits en JSON (un fichier par commit) ; ``--compare``
+signale les étapes plus lentes qu'une mesure de référence.
+
+Exemple :
+
+    python benchmark.py --scales 1 10 100
+    python benchmark.py --scales 1 --compare benchmarks/<commit>.json
+    python benchmark.py --scales 1 --no-pages --cold-start
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+PAGES = sorted((ROOT / "pages").glob("*.py"))
+RESULTS_DIR = ROOT / "benchmarks"
+LEGACY_MARKER_LIMIT = 20_000  # au-delà, la boucle iterrows prendrait plusieurs minutes
+MIN_DELTA_S = 0.005
+# 📌 Objectif : première carte affichée en moins d'une demi-seconde après un redémarrage (processus préchauffé)
+FIRST_MAP_TARGET_S = 0.5
+
+
+def timed(fn, repeat=3):
+    """Durées (s) de ``repeat`` appels : médiane, minimum et dernier résultat."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(durations), "min_s": min(durations)}, result
+
+
+def synthetic_companies(df, scale, seed=0):
+    """Registre ``scale`` fois plus grand : copies des sites décalées de quelques centaines de mètres."""
+    if scale == 1:
+        return df
+    rng = np.random.default_rng(seed)
+    synthetic = pd.concat([df] * scale, ignore_index=True)
+    synthetic["latitude"] = synthetic["latitude"] + rng.normal(0, 0.003, len(synthetic))
+    synthetic["longitude"] = synthetic["longitude"] + rng.normal(0, 0.004, len(synthetic))
+    synthetic["OMoD"] = np.arange(len(synthetic), dtype="int64")
+    return synthetic
+
+
+def reset_caches(companies=None, store=True):
+    """Vide les caches de données et de cartes (et installe un registre synthétique s'il est fourni).
+
+    Avec ``store``, vide aussi le store Feather : la lecture suivante parse les CSV.
+    """
+    from utils import allocation, clustering, data, proximity, scenario, siting, summary
+    from utils import store as feather_store
+    from utils.map_cache import map_cache
+
+    if store and feather_store.STORE_DIR.is_dir():
+        shutil.rmtree(feather_store.STORE_DIR)
+    data.clear_cache()
+    map_cache.clear()
+    for cached in (
+        allocation._cached_allocation, clustering._cached_index, proximity._cached_tree,
+        proximity._cached_catchments, scenario._cached_scenario, scenario._cached_gaps,
+        siting._cached_surface, summary._cached_summaries,
+    ):
+        cached.cache_clear()
+    if companies is not None:
+        data.prime_cache(data.COMPANIES_CSV, companies)
+
+
+def legacy_markers(df):
+    """Ancienne construction de la page 1 : un ``CircleMarker`` par ligne via ``iterrows``."""
+    import folium
+
+    from utils.maps import COLOR_MAP, DEFAULT_COLOR, DEFAULT_SIZE, SIZE_MAP, build_base_map
+
+    m = build_base_map()
+    for _, row in df.iterrows():
+        folium.CircleMarker(
+            location=[row["latitude"], row["longitude"]],
+            radius=SIZE_MAP.get(row["Group"], DEFAULT_SIZE),
+            color=COLOR_MAP.get(row["Group"], DEFAULT_COLOR),
+            fill=True,
+            fill_color=COLOR_MAP.get(row["Group"], DEFAULT_COLOR),
+            fill_opacity=0.6,
+            popup=f"{row['Companies']} - {row['Cities']} ({row['Group']})",
+        ).add_to(m)
+    return m
+
+
+def bench_components(companies, repeat):
+    """Étapes isolées : données, carte des entreprises, géométries, clics."""
+    from utils.clustering import CLUSTER_THRESHOLD, PointIndex
+    from utils.data import load_cantons, load_companies, load_potentiel_total
+    from utils.geometry import cantons_topojson
+    from utils.maps import build_companies_map
+    from utils.spatial import get_canton_locator
+
+    results = {"rows": len(companies)}
+
+    reset_caches()
+    results["load_companies_cold"], _ = timed(lambda: (reset_caches(), load_companies()), repeat)
+    results["load_companies_store"], _ = timed(lambda: (reset_caches(store=False), load_companies()), repeat)
+    results["load_companies_warm"], _ = timed(load_companies, repeat)
+    results["load_potentiel_cold"], _ = timed(lambda: (reset_caches(), load_potentiel_total()), repeat)
+    reset_caches(companies)
+
+    if len(companies) <= CLUSTER_THRESHOLD:
+        results["companies_map_build"], m = timed(lambda: build_companies_map(companies), repeat)
+        results["companies_map_render"], html = timed(lambda: m.get_root().render(), repeat)
+        results["companies_map_bytes"] = len(html.encode("utf-8"))
+    else:
+        results["cluster_index_build"], index = timed(lambda: PointIndex(companies), repeat)
+        bounds = {"_southWest": {"lat": 45.8, "lng": 5.9}, "_northEast": {"lat": 47.85, "lng": 10.55}}
+        results["cluster_query_zoom8"], clusters = timed(lambda: index.query(bounds, 8), repeat)
+        results["cluster_query_rows"] = len(clusters)
+
+    if len(companies) <= LEGACY_MARKER_LIMIT:
+        results["legacy_iterrows_markers"], legacy = timed(lambda: legacy_markers(companies), 1)
+        results["legacy_iterrows_bytes"] = len(legacy.get_root().render().encode("utf-8"))
+
+    gdf = load_cantons()
+    results["gdf_to_json"], geojson = timed(gdf.to_json, repeat)
+    results["gdf_to_json_bytes"] = len(geojson.encode("utf-8"))
+    results["topojson_medium"], topology = timed(lambda: json.dumps(cantons_topojson("medium")), repeat)
+    results["topojson_medium_bytes"] = len(topology.encode("utf-8"))
+
+    rng = np.random.default_rng(1)
+    lats = rng.uniform(45.9, 47.7, 1000)
+    lngs = rng.uniform(6.0, 10.4, 1000)
+    locator = get_canton_locator()
+    stats, _ = timed(lambda: [locator.locate(lat, lng) for lat, lng in zip(lats, lngs)], repeat)
+    results["click_resolution_us"] = stats["median_s"] / len(lats) * 1e6
+
+    def brute_force():
+        from shapely.geometry import Point
+
+        # Ancien chemin des pages : buffer d'environ 1 km puis intersection avec toutes les géométries
+        selected = []
+        for lat, lng in zip(lats[:100], lngs[:100]):
+            clicked = gdf[gdf.geometry.intersects(Point(lng, lat).buffer(0.01))]
+            selected.append(None if clicked.empty else clicked.iloc[0]["id"])
+        return selected
+
+    stats, _ = timed(brute_force, 1)
+    results["legacy_click_resolution_us"] = stats["median_s"] / 100 * 1e6
+    return results
+
+
+def bench_pages(companies, repeat):
+    """Exécution complète de chaque page, à froid puis à chaud."""
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    for page in PAGES:
+        def run():
+            at = AppTest.from_file(str(page), default_timeout=600).run()
+            if at.exception:
+                raise RuntimeError(f"{page.name} : {at.exception[0].value}")
+            return at
+
+        cold = []
+        for _ in range(repeat):
+            reset_caches(companies)
+            start = time.perf_counter()
+            run()
+            cold.append(time.perf_counter() - start)
+        warm, _ = timed(run, repeat)
+        results[page.stem] = {"cold_s": statistics.median(cold), "warm_s": warm["median_s"]}
+    return results
+
+
+def first_map(page, warm):
+    """Exécution de ``page`` dans l'interpréteur courant, supposé neuf (voir ``bench_cold_start``)."""
+    from streamlit.testing.v1 import AppTest
+
+    from utils.warmup import warm_up
+
+    warm_up_s = sum(warm_up().values()) if warm else None
+    start = time.perf_counter()
+    at = AppTest.from_file(str(ROOT / "pages" / page), default_timeout=600).run()
+    if at.exception:
+        raise RuntimeError(f"{page} : {at.exception[0].value}")
+    return {"first_map_s": time.perf_counter() - start, "warm_up_s": warm_up_s}
+
+
+def bench_cold_start(repeat):
+    """Temps jusqu'à la première carte de chaque page dans un processus neuf, sans et avec préchauffage."""
+    results = {}
+    for page in PAGES:
+        results[page.stem] = {}
+        for mode in ("sans_prechauffage", "prechauffe"):
+            runs = []
+            for _ in range(repeat):
+                command = [sys.executable, str(Path(__file__).resolve()), "--first-map", page.name]
+                if mode == "prechauffe":
+                    command.append("--warm")
+                output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            results[page.stem][mode] = {
+                "first_map_s": statistics.median(run["first_map_s"] for run in runs),
+                **({"warm_up_s": statistics.median(run["warm_up_s"] for run in runs)} if mode == "prechauffe" else {}),
+            }
+        ok = results[page.stem]["prechauffe"]["first_map_s"] <= FIRST_MAP_TARGET_S
+        print(
+            f"{'✅' if ok else '❌'} {page.stem} : "
+            f"{results[page.stem]['sans_prechauffage']['first_map_s']:.2f} s → "
+            f"{results[page.stem]['prechauffe']['first_map_s']:.2f} s (objectif {FIRST_MAP_TARGET_S} s)"
+        )
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results, prefix=""):
+    """Durées à plat (``scale/section/étape``) pour la comparaison entre deux fichiers."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            if "median_s" in value:
+                flat[name] = value["median_s"]
+            else:
+                flat.update(flatten(value, f"{name}/"))
+        elif key.endswith("_s"):
+            flat[name] = value
+        elif key.endswith("_us"):
+            flat[name] = value / 1e6
+    return flat
+
+
+def compare(current, baseline, threshold, min_delta=MIN_DELTA_S):
+    """Étapes plus lentes de plus de ``threshold`` (fraction) et de ``min_delta`` secondes que la référence.
+
+    Le seuil absolu évite de signaler le bruit des mesures de quelques microsecondes.
+    """
+    sections = ("scales", "cold_start")
+    now = flatten({key: current[key] for key in sections if key in current})
+    before = flatten({key: baseline[key] for key in sections if key in baseline})
+    return [
+        (name, before[name], now[name])
+        for name in sorted(now.keys() & before.keys())
+        if now[name] > before[name] * (1 + threshold) and now[name] - before[name] > min_delta
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure les performances des pages du dashboard.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="Facteurs de taille du registre")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions de chaque mesure")
+    parser.add_argument("--no-pages", action="store_true", help="Ne mesurer que les étapes isolées")
+    parser.add_argument("-o", "--output", type=Path, help="Fichier JSON (défaut : benchmarks/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Résultats de référence à comparer")
+    parser.add_argument("--cold-start", action="store_true", help="Mesurer le temps jusqu'à la première carte après un redémarrage")
+    parser.add_argument("--first-map", help=argparse.SUPPRESS)
+    parser.add_argument("--warm", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--threshold", type=float, default=0.2, help="Ralentissement toléré (0.2 = +20 %%)")
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA_S, help="Écart minimal signalé (s)")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT))
+    if args.first_map:
+        # Sous-processus de ``bench_cold_start`` : Streamlit est importé avant le chronomètre,
+        # comme dans un serveur déjà démarré
+        import streamlit  # noqa: F401
+
+        print(json.dumps(first_map(args.first_map, args.warm)))
+        return 0
+
+    from utils import store
+    from utils.data import load_companies
+    from utils.map_cache import map_cache
+
+    # Les cartes synthétiques ne doivent pas atterrir dans le cache disque de l'application,
+    # et les mesures à froid vident un store temporaire plutôt que celui de data/store
+    map_cache.directory = None
+    store.STORE_DIR = Path(tempfile.mkdtemp(prefix="mapght-store-"))
+
+    reset_caches()
+    real = load_companies()
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "scales": {},
+    }
+    for scale in args.scales:
+        companies = synthetic_companies(real, scale)
+        print(f"⏱️  Échelle ×{scale} ({len(companies)} entreprises)")
+        scale_results = {"components": bench_components(companies, args.repeat)}
+        if not args.no_pages:
+            scale_results["pages"] = bench_pages(companies, args.repeat)
+        results["scales"][f"x{scale}"] = scale_results
+    reset_caches()
+    if args.cold_start:
+        print("⏱️  Première carte après redémarrage")
+        results["cold_start"] = bench_cold_start(args.repeat)
+
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"✅ Résultats enregistrés sous : {output}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold, args.min_delta)
+        for name, before, now in regressions:
+            print(f"❌ {name} : {before:.4f} s → {now:.4f} s ({now / before - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"✅ Aucune régression au-delà de {args.threshold:.0%} par rapport à {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
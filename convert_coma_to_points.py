@@ -1,26 +1,107 @@
+"""Ingestion des exports d'entreprises géocodées.
+
+Lit un export CSV par blocs (mémoire bornée, quelle que soit la taille du
+fichier), détecte le séparateur sur un échantillon, convertit les latitudes
+et longitudes à virgule décimale en float, écarte les coordonnées hors de
+Suisse et écrit le fichier corrigé au fil de l'eau.
+
+Exemple :
+
+    python convert_coma_to_points.py Companies_geocoded_all_unique.csv \\
+        -o data/Companies_geocoded_all_unique_corrected.csv
+"""
+import argparse
+import csv
+import sys
+from pathlib import Path
+
 import pandas as pd
 
-# Nom du fichier original
-input_file = "/Users/lolevray/Documents/Consulting/TreaTech/Data/GIS/Couches_csv/Companies_geocoded_all_unique.csv"
-# Nom du fichier corrigé
-output_file = "/Users/lolevray/Documents/Consulting/TreaTech/Data/GIS/Couches_csv/Companies_geocoded_all_unique_corrected.csv"
-
-try:
-    # Essayer d'ouvrir avec une virgule comme séparateur
-    df = pd.read_csv(input_file, sep=",")
-except pd.errors.ParserError:
-    # Si erreur, essayer avec un point-virgule
-    df = pd.read_csv(input_file, sep=";")
-
-# Vérifier si les colonnes latitude et longitude existent
-if "latitude" in df.columns and "longitude" in df.columns:
-    # Remplacer les virgules par des points et convertir en float
-    df["latitude"] = df["latitude"].str.replace(",", ".").astype(float)
-    df["longitude"] = df["longitude"].str.replace(",", ".").astype(float)
-    
-    # Sauvegarder le fichier corrigé
-    df.to_csv(output_file, index=False)
+from utils.spatial import in_swiss_bbox
+
+COORD_COLUMNS = ["latitude", "longitude"]
+SAMPLE_SIZE = 64 * 1024
+CHUNKSIZE = 100_000
+
+
+def sniff_dialect(path, sample_size=SAMPLE_SIZE, encoding="utf-8-sig"):
+    """Détecte le séparateur sur les premiers octets du fichier."""
+    with open(path, encoding=encoding, newline="") as f:
+        sample = f.read(sample_size)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        # Échantillon ambigu : séparateur le plus fréquent sur la ligne d'en-tête
+        header = sample.splitlines()[0] if sample else ""
+        dialect = csv.excel()
+        dialect.delimiter = max(",;\t|", key=header.count)
+        return dialect
+
+
+def normalize_decimals(chunk, columns=COORD_COLUMNS):
+    """Convertit en float les colonnes à virgule décimale (« 46,52 » → 46.52)."""
+    for col in columns:
+        if col in chunk.columns and not pd.api.types.is_float_dtype(chunk[col]):
+            chunk[col] = pd.to_numeric(
+                chunk[col].astype("string").str.replace(",", ".", regex=False).str.strip(),
+                errors="coerce",
+            )
+    return chunk
+
+
+def convert(input_file, output_file, rejects_file=None, chunksize=CHUNKSIZE, encoding="utf-8-sig"):
+    """Convertit ``input_file`` vers ``output_file`` bloc par bloc et retourne les compteurs."""
+    dialect = sniff_dialect(input_file, encoding=encoding)
+    header = pd.read_csv(input_file, sep=dialect.delimiter, nrows=0, encoding=encoding).columns
+    missing = [col for col in COORD_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"Colonnes absentes du fichier : {', '.join(missing)}")
+
+    reader = pd.read_csv(
+        input_file,
+        sep=dialect.delimiter,
+        quotechar=dialect.quotechar,
+        encoding=encoding,
+        # Les coordonnées sont lues en texte puis converties en une passe vectorisée
+        dtype={col: "string" for col in COORD_COLUMNS},
+        chunksize=chunksize,
+    )
+    stats = {"rows": 0, "written": 0, "rejected": 0, "separator": dialect.delimiter}
+    first = True
+    for chunk in reader:
+        chunk = normalize_decimals(chunk)
+        valid = in_swiss_bbox(chunk["latitude"], chunk["longitude"])
+        chunk[valid].to_csv(output_file, mode="w" if first else "a", header=first, index=False)
+        if rejects_file is not None:
+            chunk[~valid].to_csv(rejects_file, mode="w" if first else "a", header=first, index=False)
+        stats["rows"] += len(chunk)
+        stats["written"] += int(valid.sum())
+        stats["rejected"] += int((~valid).sum())
+        first = False
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corrige les coordonnées d'un export d'entreprises géocodées.")
+    parser.add_argument("input_file", type=Path, help="Fichier CSV original")
+    parser.add_argument("-o", "--output", type=Path, help="Fichier corrigé (défaut : <input>_corrected.csv)")
+    parser.add_argument("--rejects", type=Path, help="Fichier des lignes hors de Suisse ou sans coordonnées")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Nombre de lignes lues par bloc")
+    args = parser.parse_args(argv)
+
+    output_file = args.output or args.input_file.with_name(f"{args.input_file.stem}_corrected.csv")
+    try:
+        stats = convert(args.input_file, output_file, args.rejects, args.chunksize)
+    except ValueError as e:
+        print(f"❌ Erreur : {e}")
+        return 1
 
     print(f"✅ Fichier corrigé enregistré sous : {output_file}")
-else:
-    print("❌ Erreur : Colonnes 'latitude' et 'longitude' non trouvées dans le fichier.")
\ No newline at end of file
+    print(f"   {stats['written']} lignes écrites sur {stats['rows']} (séparateur {stats['separator']!r})")
+    if stats["rejected"]:
+        print(f"⚠️ {stats['rejected']} lignes écartées (coordonnées absentes ou hors de Suisse)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Export hors interface des livrables par canton.
+
+Pour chaque canton : carte énergétique (HTML) avec ses entreprises, graphiques
+de composition des potentiels (HTML, PNG en option), résumé JSON et liste des
+entreprises (CSV), plus une synthèse nationale. Les cantons sont rendus en
+parallèle ; un canton dont les sources n'ont pas changé n'est pas régénéré.
+
+Exemple :
+
+    python export_reports.py -o rapports --workers 4
+    python export_reports.py -o rapports --cantons VS GE --png
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from utils.data import load_cantons
+from utils.reports import export_canton, write_shared
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporte les cartes et rapports de chaque canton.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("rapports"), help="Dossier de sortie")
+    parser.add_argument("--cantons", nargs="+", help="Codes des cantons à exporter (défaut : tous)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus de rendu")
+    parser.add_argument("--png", action="store_true", help="Exporter aussi les graphiques en PNG (paquet kaleido requis)")
+    parser.add_argument("--force", action="store_true", help="Tout régénérer, même les cantons inchangés")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    all_cantons = sorted(load_cantons()["id"])
+    cantons = args.cantons or all_cantons
+    unknown = sorted(set(cantons) - set(all_cantons))
+    if unknown:
+        print(f"❌ Erreur : Cantons inconnus : {', '.join(unknown)}")
+        return 1
+
+    if args.png:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            print("❌ Erreur : L'export PNG nécessite le paquet kaleido (pip install kaleido)")
+            return 1
+
+    write_shared(args.output)
+    export = partial(export_canton, output_dir=args.output, png=args.png, force=args.force)
+    if args.workers and args.workers > 1 and len(cantons) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(export, cantons))
+    else:
+        results = [export(canton) for canton in cantons]
+
+    # Synthèse nationale à partir des résumés écrits par canton
+    rows = []
+    for canton in cantons:
+        summary = json.loads((args.output / canton / "resume.json").read_text(encoding="utf-8"))
+        rows.append({
+            "Cantons": canton,
+            "Pot_Ener [GWh]": (summary["potentiel_total"] or {}).get("total"),
+            "Pot_Ener_Res [GWh]": (summary["potentiel_residuel"] or {}).get("total"),
+            "Balance_Ener [GWh]": summary["balance"],
+            "Classe": summary["classe"],
+            **{f"Entreprises_{group}": count for group, count in summary["entreprises"].items()},
+        })
+    pd.DataFrame(rows).to_csv(args.output / "synthese.csv", index=False)
+
+    updated = sum(status == "ok" for _, status in results)
+    print(f"✅ Rapports enregistrés sous : {args.output} ({time.perf_counter() - start:.1f} s)")
+    print(f"   {len(results)} cantons : {updated} générés, {len(results) - updated} inchangés")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
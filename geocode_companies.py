@@ -0,0 +1,62 @@
+"""Géocodage hors ligne du registre des entreprises.
+
+Résout les adresses contre une table de référence locale (centroïdes de rues
+et de NPA) et garde les résultats dans un cache persistant : un
+rafraîchissement ne géocode que les adresses nouvelles ou modifiées.
+
+Exemple :
+
+    python geocode_companies.py Companies_geocoded_all_unique.csv \\
+        --reference adresses_reference.csv --seed \\
+        -o data/Companies_geocoded_all_unique_corrected.csv
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from utils.geocoding import CACHE_FILE, AddressCache, ReferenceIndex, address_keys, geocode
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Géocode les adresses du registre des entreprises.")
+    parser.add_argument("input_file", type=Path, help="Registre CSV (Zip_codes, Cities, Streets, ...)")
+    parser.add_argument("--reference", type=Path, required=True, help="Table de référence (Zip_codes, Streets, latitude, longitude)")
+    parser.add_argument("-o", "--output", type=Path, help="Fichier géocodé (défaut : <input>_geocoded.csv)")
+    parser.add_argument("--cache", type=Path, default=CACHE_FILE, help="Cache SQLite des adresses")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus pour la normalisation")
+    parser.add_argument("--seed", action="store_true", help="Initialiser le cache avec les coordonnées déjà présentes")
+    parser.add_argument("--refresh", action="store_true", help="Ignorer le cache et tout géocoder à nouveau")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = pd.read_csv(args.input_file, sep=None, engine="python", encoding="utf-8-sig")
+    missing = [col for col in ["Zip_codes", "Streets"] if col not in df.columns]
+    if missing:
+        print(f"❌ Erreur : Colonnes absentes du fichier : {', '.join(missing)}")
+        return 1
+
+    cache = AddressCache(args.cache)
+    try:
+        if args.seed and {"latitude", "longitude"}.issubset(df.columns):
+            seeded = cache.seed(df, address_keys(df, args.workers))
+            print(f"   {seeded} adresses existantes ajoutées au cache")
+        result, stats = geocode(df, ReferenceIndex.from_csv(args.reference), cache, args.workers, args.refresh)
+    finally:
+        cache.close()
+
+    output_file = args.output or args.input_file.with_name(f"{args.input_file.stem}_geocoded.csv")
+    result.to_csv(output_file, index=False)
+    print(f"✅ Fichier géocodé enregistré sous : {output_file} ({time.perf_counter() - start:.1f} s)")
+    print(
+        f"   {stats['addresses']} adresses : {stats['from_cache']} depuis le cache, "
+        f"{stats['geocoded']} géocodées, {stats['not_found']} lignes sans coordonnées"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,38 @@
 import streamlit as st
-import pandas as pd
 import folium
 from streamlit_folium import st_folium
 
+from utils.allocation import ESTIMATE_NOTE, quantities_declared
+from utils.clustering import CLUSTER_THRESHOLD, get_point_index
+from utils.data import load_companies
+from utils.maps import (
+    add_catchments_layer,
+    add_clusters_layer,
+    build_base_map,
+    companies_map_html,
+    filter_companies,
+    filtered_catchments,
+)
+from utils.profiling import page_profiler
+from utils.spatial import SWISS_BBOX
+
 # 📌 Configurer la largeur maximale de la page
 st.set_page_config(layout="wide")
 
+# 📌 Mesure des étapes du rerun (panneau ⏱️ dans la barre latérale)
+profiler = page_profiler("entreprises")
+
 # 📌 Titre de l'application
 st.title("Carte interactive des entreprises qui remettent, regroupent et éliminent des déchets spéciaux liquides en Suisse")
 st.markdown("<h3 style='font-size:20px;'>Visualisez les entreprises par catégorie et exportez les données filtrées.</h3>", unsafe_allow_html=True)
 
-# 📌 Charger le fichier corrigé
-csv_file = "data/Companies_geocoded_all_unique_corrected.csv"
-df = pd.read_csv(csv_file)
+# 📌 Charger le fichier corrigé (lu une seule fois par processus)
+with profiler.stage("load"):
+    df = load_companies()
 
 # 📌 Vérifier les colonnes nécessaires
 if {"latitude", "longitude", "Group", "Cantons"}.issubset(df.columns):
 
-    # 🟢 Définition des couleurs et tailles selon "Group"
-    color_map = {"Remettantes": "green", "Incinération": "red", "Regroupement": "blue"}
-    size_map = {"Remettantes": 2, "Incinération": 8, "Regroupement": 4}
-
     # 📌 Filtres côte à côte au-dessus de la carte
     st.subheader("Filtres")
     col_filters1, col_filters2 = st.columns(2)
@@ -31,10 +43,14 @@ if {"latitude", "longitude", "Group", "Cantons"}.issubset(df.columns):
     with col_filters2:
         selected_group = st.multiselect("Filtrer par type d'entreprise :", df["Group"].unique(), default=df["Group"].unique())
 
+    # 📌 Zones de desserte : chaque remettant est rattaché à l'installation la plus proche
+    show_catchments = st.checkbox("Afficher les zones de desserte des installations (potentiel cumulé par installation)")
+    if show_catchments and not quantities_declared():
+        st.caption(f"⚠️ {ESTIMATE_NOTE}")
+
     # 📌 Appliquer les filtres aux données
-    filtered_df = df[df["Group"].isin(selected_group)]
-    if selected_canton != "Tous":
-        filtered_df = filtered_df[filtered_df["Cantons"] == selected_canton]
+    with profiler.stage("merge"):
+        filtered_df = filter_companies(df, selected_canton, selected_group)
 
     # Affichage des données brutes filtrées
     st.subheader("Données détaillées")
@@ -46,32 +62,48 @@ if {"latitude", "longitude", "Group", "Cantons"}.issubset(df.columns):
         mime="text/csv"
     )
 
-    # 🗺️ Création de la carte avec un fond clair
-    m = folium.Map(
-        location=[46.8182, 8.2275], 
-        zoom_start=8, 
-        tiles="CartoDB positron",
-        attr='© OpenStreetMap contributors, © CartoDB'
-    )
-
-    # 📌 Ajouter les points en tant que cercles colorés et redimensionnés
-    for _, row in filtered_df.iterrows():
-        folium.CircleMarker(
-            location=[row["latitude"], row["longitude"]],
-            radius=size_map.get(row["Group"], 5),  # Taille du cercle
-            color=color_map.get(row["Group"], "gray"),  # Bordure du cercle
-            fill=True,
-            fill_color=color_map.get(row["Group"], "gray"),  # Remplissage du cercle
-            fill_opacity=0.6,
-            popup=f"{row['Companies']} - {row['Cities']} ({row['Group']})"
-        ).add_to(m)
-
-    # Affichage de la carte en pleine largeur
-    st_folium(m, width=1400, height=650)
+    if len(filtered_df) <= CLUSTER_THRESHOLD:
+        # 🗺️ Carte avec un fond clair, construite une seule fois par état de filtres
+        # (le clic n'est pas exploité ici : le HTML mis en cache est affiché tel quel)
+        with profiler.stage("map_build"):
+            html = companies_map_html(selected_canton, selected_group, show_catchments)
+        with profiler.stage("render"):
+            st.iframe(html, width=1400, height=650)
+        profiler.set_payload(html)
+    else:
+        # 🗺️ Grands registres : seuls les groupes et points de la fenêtre visible sont envoyés
+        # au navigateur ; la fenêtre et le zoom viennent du dernier rendu de la carte
+        view = st.session_state.get("companies_map") or {}
+        min_lng, min_lat, max_lng, max_lat = SWISS_BBOX
+        bounds = view.get("bounds") or {
+            "_southWest": {"lat": min_lat, "lng": min_lng},
+            "_northEast": {"lat": max_lat, "lng": max_lng},
+        }
+        with profiler.stage("map_build"):
+            clusters = get_point_index(selected_canton, selected_group).query(bounds, view.get("zoom") or 8)
+            layer = folium.FeatureGroup(name="Entreprises")
+            add_clusters_layer(layer, clusters)
+            if show_catchments:
+                add_catchments_layer(layer, filtered_catchments(selected_canton))
+            m = build_base_map()
+        with profiler.stage("render"):
+            st_folium(
+                m,
+                key="companies_map",
+                feature_group_to_add=layer,
+                returned_objects=["bounds", "zoom"],
+                width=1400,
+                height=650
+            )
+
+    if show_catchments:
+        st.subheader("Zones de desserte")
+        st.dataframe(
+            filtered_catchments(selected_canton).drop(columns=["latitude", "longitude"]).sort_values("Pot_Ener [GWh]", ascending=False),
+            height=250
+        )
 
 else:
     st.error("Les colonnes nécessaires ('latitude', 'longitude', 'Group', 'Cantons') ne sont pas présentes dans le fichier CSV.")
 
-
-
-
+profiler.finish()
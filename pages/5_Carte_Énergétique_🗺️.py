@@ -0,0 +1,27 @@
+import streamlit as st
+
+from utils.data import available_years
+from utils.energy_map import LAYERS
+from utils.energy_page import render_energy_page
+from utils.geometry import cantons_geojson
+from utils.timeseries import animated_choropleth
+
+
+# 📌 Configuration de la page Streamlit
+st.set_page_config(layout="wide")
+st.title("Carte énergétique par canton")
+st.markdown("<h3 style='font-size:20px;'>Potentiel total, potentiel résiduel et balance énergétique (en GWh) sur une seule carte : choisissez la couche affichée dans le contrôle en haut à droite de la carte.</h3>", unsafe_allow_html=True)
+
+# 📌 Une seule carte (et une seule géométrie) pour les trois couches, avec le sélecteur d'année
+years = render_energy_page("carte_energetique", list(LAYERS))
+
+# 📌 Évolution annuelle : choroplèthe animée (une image par année, animation dans le navigateur)
+if len(years) > 1:
+    st.subheader("Évolution annuelle")
+    series_layer = st.radio(
+        "Indicateur", list(LAYERS), format_func=lambda key: LAYERS[key]["label"], horizontal=True
+    )
+    if available_years(series_layer):
+        st.plotly_chart(animated_choropleth(series_layer, cantons_geojson("coarse")), use_container_width=True)
+    else:
+        st.info("Pas de série annuelle pour cet indicateur.")
@@ -0,0 +1,95 @@
+import streamlit as st
+import folium
+
+from utils.aggregation import FLOWS
+from utils.allocation import ESTIMATE_NOTE, FACILITY_GROUPS, quantities_declared, quantity_sources
+from utils.map_cache import artifact_key, map_cache
+from utils.maps import build_base_map
+from utils.profiling import page_profiler
+from utils.proximity import get_company_tree
+from utils.siting import BANDWIDTH_KM, density_surface
+from utils.spatial import get_canton_locator
+from utils.summary import FLOW_LABELS
+
+# 📌 Configuration de la page Streamlit
+st.set_page_config(layout="wide")
+profiler = page_profiler("implantation")
+st.title("Implantation d'installations de gazéification hydrothermale (GHT)")
+st.markdown("<h3 style='font-size:20px;'>Densité du potentiel énergétique des remettants (en GWh/km²), lissée par un noyau gaussien, et meilleurs emplacements candidats pour une installation GHT.</h3>", unsafe_allow_html=True)
+if not quantities_declared():
+    st.caption(
+        f"⚠️ {ESTIMATE_NOTE} La densité reflète donc la répartition des remettants dans chaque canton, "
+        "pas leurs volumes réels."
+    )
+
+# 📌 Paramètres de la surface : largeur de bande, mélange de flux et nombre de candidats
+with st.sidebar:
+    st.subheader("Paramètres")
+    bandwidth_km = st.slider("Largeur de bande (km)", 2.0, 50.0, BANDWIDTH_KM, 1.0)
+    mix = {
+        flow: st.slider(f"Poids du flux {flow} ({label})", 0.0, 1.0, 1.0, 0.1)
+        for flow, label in zip(FLOWS, FLOW_LABELS.values())
+    }
+    n_candidates = st.number_input("Nombre d'emplacements candidats", 1, 30, 10)
+
+# 📌 Surface en cache par (largeur de bande, mélange de flux)
+with profiler.stage("load"):
+    surface = density_surface(bandwidth_km, mix)
+    candidates = surface.candidates(int(n_candidates))
+
+# 📌 Canton de chaque candidat et installation existante la plus proche
+with profiler.stage("merge"):
+    candidates["Cantons"] = get_canton_locator().locate_many(candidates["latitude"], candidates["longitude"])
+    facilities = get_company_tree(FACILITY_GROUPS)
+    distances, indices = facilities.nearest(candidates["latitude"], candidates["longitude"])
+    candidates["Installation la plus proche"] = facilities.df["Companies"].iloc[indices[:, 0]].to_numpy()
+    candidates["Distance [km]"] = distances[:, 0]
+
+
+# 📌 Carte : la surface est une seule image, les candidats quelques marqueurs
+def build_map():
+    m = build_base_map()
+    min_lng, min_lat, max_lng, max_lat = surface.bounds
+    folium.raster_layers.ImageOverlay(
+        surface.rgba(),
+        bounds=[[min_lat, min_lng], [max_lat, max_lng]],
+        mercator_project=True,
+        name="Densité du potentiel",
+    ).add_to(m)
+    candidates_layer = folium.FeatureGroup(name="Emplacements candidats").add_to(m)
+    for rank, lat, lng, canton, density in zip(
+        candidates["Rang"], candidates["latitude"], candidates["longitude"],
+        candidates["Cantons"], candidates["Densité [GWh/km²]"]
+    ):
+        folium.Marker(
+            [lat, lng],
+            tooltip=f"#{rank} – {canton or 'hors canton'} : {density:.3f} GWh/km²",
+            icon=folium.DivIcon(html=f"<div style='font-weight:bold;color:#084594;font-size:14px'>{rank}</div>"),
+        ).add_to(candidates_layer)
+    folium.LayerControl(collapsed=False).add_to(m)
+    return m
+
+
+with profiler.stage("map_build"):
+    html = map_cache.get_html(
+        artifact_key(
+            "implantation", quantity_sources(),
+            bandwidth_km=bandwidth_km, mix=mix, n_candidates=int(n_candidates)
+        ),
+        build_map
+    )
+with profiler.stage("render"):
+    st.iframe(html, width=1400, height=650)
+profiler.set_payload(html)
+
+# 📌 Tableau des emplacements candidats
+st.subheader("Emplacements candidats")
+st.dataframe(candidates, hide_index=True)
+st.download_button(
+    label="Télécharger les emplacements",
+    data=candidates.to_csv(index=False),
+    file_name="emplacements_ght.csv",
+    mime="text/csv"
+)
+
+profiler.finish()
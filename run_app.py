@@ -0,0 +1,39 @@
+"""Lance le dashboard Streamlit dans un processus préchauffé (voir ``utils.warmup``).
+
+La pile géographique, les jeux de données partagés et les cartes des
+entreprises sont chargés avant que le serveur n'écoute, donc avant la
+première session : la première carte affichée après un redémarrage ne paie
+plus ces imports, ces lectures ni ces constructions.
+Les options non reconnues sont transmises à ``streamlit run``.
+
+Exemple :
+
+    python run_app.py --server.port 8501 --server.headless true
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lance le dashboard avec un processus préchauffé.")
+    parser.add_argument("--no-warm-up", action="store_true", help="Ne pas préchauffer le processus")
+    args, streamlit_args = parser.parse_known_args(argv)
+
+    if not args.no_warm_up:
+        from utils.warmup import warm_up
+
+        timings = warm_up()
+        details = ", ".join(f"{name} {seconds:.1f} s" for name, seconds in timings.items())
+        print(f"✅ Processus préchauffé en {sum(timings.values()):.1f} s ({details})")
+
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", str(ROOT / "Accueil.py"), *streamlit_args]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
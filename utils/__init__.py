@@ -0,0 +1 @@
+"""Modules partagés entre les pages du dashboard GHT."""
@@ -0,0 +1,72 @@
+"""Calcul des potentiels énergétiques et agrégation par niveau administratif.
+
+Les potentiels ``Pot_Ener_XX [GWh]`` sont le produit des quantités
+``Quantities_XX [Kg]`` par le PCI de chaque flux. On les calcule ici à partir
+des quantités déclarées par entreprise, puis on les agrège (group-by) au
+niveau voulu : commune, district ou canton. Chaque agrégat est gardé en cache
+par niveau, tant que les fichiers sources ne changent pas.
+"""
+import numpy as np
+
+from utils.data import COMPANIES_CSV, COMPANY_QUANTITIES_CSV, cached_resource, load_companies, load_company_quantities
+
+# 📌 Flux du chap. 07 de l'OMoD et PCI utilisés pour le potentiel total (MJ/kg)
+FLOWS = ["01", "04", "08", "11"]
+PCI_MJ_KG = {"01": 5.073, "04": 21.365, "08": 7.5, "11": 6.5}
+MJ_PER_GWH = 3.6e6
+
+QUANTITY_COLUMNS = [f"Quantities_{flow} [Kg]" for flow in FLOWS]
+POTENTIAL_COLUMNS = [f"Pot_Ener_{flow} [GWh]" for flow in FLOWS]
+TOTAL_COLUMN = "Pot_Ener [GWh]"
+
+# 📌 Colonnes qui définissent chaque niveau administratif dans la table des entreprises
+ADMIN_LEVELS = {
+    "canton": ["Cantons"],
+    "district": ["Cantons", "District"],
+    "commune": ["Cantons", "Zip_codes", "Cities"],
+}
+
+
+def compute_potentials(df, pci=None):
+    """Ajoute les colonnes de potentiel (GWh) calculées depuis les quantités (kg).
+
+    Une seule multiplication matricielle pour tous les flux et toutes les lignes.
+    """
+    pci = {**PCI_MJ_KG, **(pci or {})}
+    quantities = df[QUANTITY_COLUMNS].to_numpy(dtype=float)
+    potentials = quantities * (np.array([pci[flow] for flow in FLOWS]) / MJ_PER_GWH)
+    result = df.copy()
+    result[POTENTIAL_COLUMNS] = potentials
+    result[TOTAL_COLUMN] = potentials.sum(axis=1)
+    return result
+
+
+def company_table(companies=None, quantities=None):
+    """Entreprises enrichies de leurs quantités par flux (0 si rien n'est déclaré)."""
+    companies = load_companies() if companies is None else companies
+    quantities = load_company_quantities() if quantities is None else quantities
+    table = companies.merge(quantities[["OMoD"] + QUANTITY_COLUMNS], on="OMoD", how="left")
+    table[QUANTITY_COLUMNS] = table[QUANTITY_COLUMNS].fillna(0)
+    return table
+
+
+def rollup(table, level="canton", pci=None):
+    """Quantités et potentiels agrégés au niveau ``level`` de :data:`ADMIN_LEVELS`."""
+    if level not in ADMIN_LEVELS:
+        raise ValueError(f"Niveau inconnu : {level!r} (attendu : {', '.join(ADMIN_LEVELS)})")
+    keys = ADMIN_LEVELS[level]
+    missing = [key for key in keys if key not in table.columns]
+    if missing:
+        raise ValueError(f"Colonnes absentes pour le niveau {level!r} : {', '.join(missing)}")
+    grouped = table.groupby(keys, sort=True, observed=True)[QUANTITY_COLUMNS].sum().reset_index()
+    return compute_potentials(grouped, pci)
+
+
+def get_rollup(level="canton"):
+    """Agrégat du niveau ``level`` calculé depuis les entreprises, en cache par processus.
+
+    Recalculé dès que les quantités ou le registre des entreprises changent.
+    """
+    return cached_resource(
+        f"rollup:{level}", [COMPANY_QUANTITIES_CSV, COMPANIES_CSV], lambda _: rollup(company_table(), level)
+    ).copy(deep=False)
@@ -0,0 +1,222 @@
+"""Répartition optimale des flux entre remettants et installations.
+
+Les remettants (``Group == "Remettantes"``) livrent leurs flux du mélange
+(eaux solvantées 01, solvants usagés 04) aux installations d'incinération et
+de regroupement. On cherche la répartition qui minimise les tonnes-kilomètres
+transportées, sous deux contraintes par installation : sa capacité (si elle
+est connue) et un mélange reçu au moins égal au PCI cible. Ce qui ne peut pas
+être placé reste chez le remettant (pénalisé dans l'objectif).
+
+Le problème est un transport à coût minimal résolu en programmation linéaire
+(HiGHS, via SciPy). Pour rester rapide avec des milliers de remettants, seuls
+les arcs vers les ``k`` installations les plus proches de chaque remettant
+sont retenus ; les distances sont calculées en une seule matrice haversine.
+Chaque résultat est gardé en cache par scénario.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregation import FLOWS, PCI_MJ_KG, QUANTITY_COLUMNS, company_table
+from utils.data import COMPANIES_CSV, COMPANY_QUANTITIES_CSV, POTENTIEL_TOT_CSV, file_signature, load_companies, load_potentiel_total
+from utils.scenario import BLEND_FLOWS, TARGET_PCI
+from utils.spatial import distance_matrix
+
+SOURCE_GROUP = "Remettantes"
+FACILITY_GROUPS = ["Incinération", "Regroupement"]
+
+# 📌 Nombre d'installations candidates par remettant et pénalité d'un kg non placé (km équivalents)
+NEAREST_FACILITIES = 8
+UNALLOCATED_PENALTY_KM = 10_000.0
+
+# 📌 Avertissement affiché tant que les quantités par remettant sont estimées
+ESTIMATE_NOTE = (
+    "Quantités par remettant estimées : sans `data/Companies_quantities.csv`, la quantité "
+    "de chaque canton est répartie à parts égales entre ses remettants."
+)
+
+
+def quantities_declared():
+    """Vrai si les quantités déclarées par entreprise sont fournies."""
+    return COMPANY_QUANTITIES_CSV.exists()
+
+
+def quantity_sources():
+    """Fichiers dont dépendent les quantités par remettant (déclarées ou estimées)."""
+    return [COMPANIES_CSV, POTENTIEL_TOT_CSV] + ([COMPANY_QUANTITIES_CSV] if quantities_declared() else [])
+
+
+def source_quantities(companies=None):
+    """Quantités par remettant et par flux (kg).
+
+    Avec ``data/Companies_quantities.csv``, ce sont les quantités déclarées.
+    Sinon, les quantités cantonales sont réparties à parts égales entre les
+    remettants du canton (estimation, voir ``ESTIMATE_NOTE``).
+    """
+    companies = load_companies() if companies is None else companies
+    sources = companies[companies["Group"] == SOURCE_GROUP]
+    if quantities_declared():
+        return company_table(sources)
+
+    cantons = load_potentiel_total().set_index("Cantons")[QUANTITY_COLUMNS]
+    cantons.index = cantons.index.astype(str)
+    table = sources.reset_index(drop=True)
+    keys = table["Cantons"].astype(str)
+    shares = cantons.reindex(keys).to_numpy(dtype=float) / keys.map(keys.value_counts()).to_numpy()[:, None]
+    table[QUANTITY_COLUMNS] = np.nan_to_num(shares)
+    return table
+
+
+def solve_transport(supply, distances, pci, target_pci, capacities=None, k=NEAREST_FACILITIES):
+    """Transport à coût minimal vers les ``k`` installations les plus proches.
+
+    ``supply`` est un tableau ``(sources, flux)`` en kg, ``distances`` une
+    matrice ``(sources, installations)`` en km, ``pci`` un vecteur ``(flux,)``
+    en MJ/kg et ``capacities`` un vecteur ``(installations,)`` en kg (``inf``
+    ou ``None`` : sans limite). Retourne ``(arcs, quantités, non_placé, coût)``
+    où ``arcs`` contient les couples (source, installation) retenus,
+    ``quantités`` est de forme ``(arcs, flux)``, ``non_placé`` de forme
+    ``(sources, flux)`` et ``coût`` est le transport en tonnes-km.
+    """
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix, vstack
+
+    supply = np.asarray(supply, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    pci = np.asarray(pci, dtype=float)
+    n_sources, n_flows = supply.shape
+    n_facilities = distances.shape[1]
+    k = min(k, n_facilities)
+
+    # Arcs candidats : les k installations les plus proches de chaque source
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    arc_source = np.repeat(np.arange(n_sources), k)
+    arc_facility = nearest.ravel()
+    arc_distance = distances[arc_source, arc_facility]
+    n_arcs = len(arc_source)
+
+    # Variables : x[arc, flux] (kg transportés) puis u[source, flux] (kg non placés)
+    n_x = n_arcs * n_flows
+    x_arc = np.repeat(np.arange(n_arcs), n_flows)
+    x_flow = np.tile(np.arange(n_flows), n_arcs)
+    cost = np.concatenate([
+        np.repeat(arc_distance, n_flows),
+        np.full(n_sources * n_flows, UNALLOCATED_PENALTY_KM),
+    ]) / 1000.0  # tonnes-km
+
+    # Offre : tout ce que livre une source est transporté ou reste non placé
+    supply_row = arc_source[x_arc] * n_flows + x_flow
+    a_eq = coo_matrix(
+        (np.ones(n_x + n_sources * n_flows),
+         (np.concatenate([supply_row, np.arange(n_sources * n_flows)]),
+          np.arange(n_x + n_sources * n_flows))),
+        shape=(n_sources * n_flows, n_x + n_sources * n_flows),
+    )
+    b_eq = supply.ravel()
+
+    # Mélange : Σ (PCI_cible - PCI_flux) × x ≤ 0 pour chaque installation
+    facility = arc_facility[x_arc]
+    blocks = [coo_matrix(
+        (target_pci - pci[x_flow], (facility, np.arange(n_x))),
+        shape=(n_facilities, n_x + n_sources * n_flows),
+    )]
+    bounds = [np.zeros(n_facilities)]
+
+    # Capacité : Σ x ≤ capacité, seulement pour les installations limitées
+    if capacities is not None:
+        capacities = np.asarray(capacities, dtype=float)
+        limited = np.flatnonzero(np.isfinite(capacities))
+        if len(limited):
+            row = np.full(n_facilities, -1)
+            row[limited] = np.arange(len(limited))
+            mask = row[facility] >= 0
+            blocks.append(coo_matrix(
+                (np.ones(mask.sum()), (row[facility][mask], np.flatnonzero(mask))),
+                shape=(len(limited), n_x + n_sources * n_flows),
+            ))
+            bounds.append(capacities[limited])
+
+    result = linprog(
+        cost, A_ub=vstack(blocks).tocsr(), b_ub=np.concatenate(bounds),
+        A_eq=a_eq.tocsr(), b_eq=b_eq, bounds=(0, None), method="highs",
+    )
+    if result.status != 0:
+        raise RuntimeError(f"Répartition impossible : {result.message}")
+
+    quantities = result.x[:n_x].reshape(n_arcs, n_flows)
+    unallocated = result.x[n_x:].reshape(n_sources, n_flows)
+    arcs = np.column_stack([arc_source, arc_facility])
+    # Coût de transport seul (sans la pénalité des quantités non placées)
+    transport = float(quantities.sum(axis=1) @ arc_distance / 1000.0)
+    return arcs, quantities, unallocated, transport
+
+
+def allocate(target_pci=TARGET_PCI, pci=None, capacities=None, k=NEAREST_FACILITIES):
+    """Répartition des flux du mélange entre remettants et installations.
+
+    ``capacities`` associe un numéro OMoD d'installation à sa capacité (kg) ;
+    les installations absentes sont sans limite. Retourne un dictionnaire avec
+    les tables ``flows`` (transferts), ``facilities`` (réception par
+    installation), ``unallocated`` (reste par remettant) et le coût total
+    ``cost`` en tonnes-km.
+    """
+    pci = {**PCI_MJ_KG, **(pci or {})}
+    capacities = tuple(sorted((int(omod), float(cap)) for omod, cap in (capacities or {}).items()))
+    result = _cached_allocation(
+        tuple(file_signature(path) for path in quantity_sources()),
+        round(float(target_pci), 6), tuple(round(float(pci[flow]), 6) for flow in BLEND_FLOWS),
+        capacities, int(k),
+    )
+    # Tables partagées par le cache : copies superficielles (lecture seule)
+    return {name: value.copy(deep=False) if isinstance(value, pd.DataFrame) else value for name, value in result.items()}
+
+
+@lru_cache(maxsize=32)
+def _cached_allocation(signatures, target_pci, pci, capacities, k):
+    companies = load_companies()
+    columns = [QUANTITY_COLUMNS[FLOWS.index(flow)] for flow in BLEND_FLOWS]
+    sources = source_quantities(companies)
+    sources = sources[sources[columns].sum(axis=1) > 0].reset_index(drop=True)
+    facilities = companies[companies["Group"].isin(FACILITY_GROUPS)].reset_index(drop=True)
+
+    distances = distance_matrix(
+        sources["latitude"], sources["longitude"], facilities["latitude"], facilities["longitude"]
+    )
+    limits = dict(capacities)
+    capacity = facilities["OMoD"].map(lambda omod: limits.get(int(omod), np.inf)).to_numpy(dtype=float)
+    arcs, quantities, unallocated, cost = solve_transport(
+        sources[columns].to_numpy(dtype=float), distances, np.array(pci), target_pci, capacity, k
+    )
+
+    # Transferts non nuls, un par (remettant, installation, flux)
+    arc_index, flow_index = np.nonzero(quantities > 1e-6)
+    source_rows = sources.iloc[arcs[arc_index, 0]].reset_index(drop=True)
+    facility_rows = facilities.iloc[arcs[arc_index, 1]].reset_index(drop=True)
+    flows = pd.DataFrame({
+        "OMoD": source_rows["OMoD"],
+        "Companies": source_rows["Companies"],
+        "Cantons": source_rows["Cantons"],
+        "Facility_OMoD": facility_rows["OMoD"],
+        "Facility": facility_rows["Companies"],
+        "Facility_Group": facility_rows["Group"],
+        "Flow": np.asarray(BLEND_FLOWS)[flow_index],
+        "Quantity [Kg]": quantities[arc_index, flow_index],
+        "Distance [km]": distances[arcs[arc_index, 0], arcs[arc_index, 1]],
+    })
+
+    # Réception par installation et PCI moyen du mélange reçu
+    received = np.zeros((len(facilities), len(BLEND_FLOWS)))
+    np.add.at(received, arcs[:, 1], quantities)
+    total = received.sum(axis=1)
+    summary = facilities[["OMoD", "Companies", "Cantons", "Group", "latitude", "longitude"]].copy()
+    summary[columns] = received
+    summary["Quantity [Kg]"] = total
+    with np.errstate(invalid="ignore", divide="ignore"):
+        summary["PCI [MJ/kg]"] = np.where(total > 0, received @ np.array(pci) / total, np.nan)
+
+    rest = sources[["OMoD", "Companies", "Cantons"]].copy()
+    rest[columns] = unallocated
+    rest = rest[rest[columns].sum(axis=1) > 1e-6].reset_index(drop=True)
+
+    return {"flows": flows, "facilities": summary, "unallocated": rest, "cost": cost}
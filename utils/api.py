@@ -0,0 +1,255 @@
+"""API HTTP en lecture seule sur la couche de données du dashboard.
+
+Application Starlette (ASGI) servie à côté de Streamlit : mêmes chargeurs,
+même cache par processus, mêmes calculs que les pages. Chaque réponse est
+produite une seule fois par état des fichiers sources et paramètres, puis
+servie depuis un petit cache LRU avec un ``ETag`` (réponse 304 si le client a
+déjà la bonne version). Le JSON est compressé en gzip ; ``?format=arrow`` (ou
+``Accept: application/vnd.apache.arrow.stream``) renvoie un flux Arrow IPC.
+
+Endpoints :
+
+- ``GET /cantons/potentials?dataset=total|residuel[&year=2023]``
+- ``GET /cantons/balance[?target_pci=16&pci_01=5.5]``
+- ``GET /locate?lat=46.2&lng=7.3``
+- ``GET /companies?bbox=min_lng,min_lat,max_lng,max_lat&group=Remettantes&canton=VS``
+
+Comme sur les pages du dashboard, potentiels et balance sont ceux des fichiers
+fournis ; la balance n'est recalculée par le modèle de mélange
+(``utils.scenario``) que si un paramètre s'écarte de la référence, et la
+réponse porte alors ``"Scenario": true``.
+"""
+import contextlib
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from utils.aggregation import FLOWS
+from utils.classification import balance_class
+from utils.data import (
+    BALANCE_CSV,
+    COMPANIES_CSV,
+    available_years,
+    dataset_path,
+    file_signature,
+    load_companies,
+    load_dataset,
+)
+from utils.scenario import TARGET_PCI, is_reference, run_scenario, scenario_sources
+from utils.spatial import locate_canton
+from utils.warmup import load_shared
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+RESPONSE_CACHE_SIZE = 512
+
+
+class ResponseCache:
+    """Corps de réponse déjà encodés, indexés par ETag (LRU, partagé entre requêtes)."""
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+class BadRequest(ValueError):
+    """Paramètre de requête invalide (réponse 400)."""
+
+
+def _wants_arrow(request):
+    fmt = request.query_params.get("format")
+    if fmt not in (None, "json", "arrow"):
+        raise BadRequest(f"Paramètre 'format' invalide : {fmt!r} (attendu : 'json' ou 'arrow')")
+    return fmt == "arrow" or ARROW_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _encode(df, arrow):
+    if arrow:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    return df.to_json(orient="records", force_ascii=False).encode("utf-8")
+
+
+async def _table_response(request, sources, params, build):
+    """Réponse d'une table : 304 si l'ETag correspond, sinon corps en cache ou construit."""
+    try:
+        arrow = _wants_arrow(request)
+    except BadRequest as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    raw = json.dumps(
+        {"path": request.url.path, "sources": [file_signature(path) for path in sources], "params": params, "arrow": arrow},
+        sort_keys=True, default=str,
+    )
+    etag = '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(etag)
+    if body is None:
+        try:
+            df = await run_in_threadpool(build)
+        except BadRequest as exc:
+            return JSONResponse({"error": str(exc)}, status_code=400)
+        body = await run_in_threadpool(_encode, df, arrow)
+        response_cache.put(etag, body)
+    media_type = ARROW_MEDIA_TYPE if arrow else "application/json"
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def _float_param(request, name, default=None):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        number = math.nan
+    if not math.isfinite(number):
+        raise BadRequest(f"Paramètre {name!r} invalide : {value!r}")
+    return number
+
+
+def _int_param(request, name, default=None):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"Paramètre {name!r} invalide : {value!r}") from None
+
+
+async def potentials(request):
+    dataset = request.query_params.get("dataset", "total")
+    if dataset not in ("total", "residuel"):
+        return JSONResponse({"error": "dataset doit valoir 'total' ou 'residuel'"}, status_code=400)
+    # Paramètre mal formé : 400 ; année bien formée mais sans partition : 404
+    try:
+        year = _int_param(request, "year")
+    except BadRequest as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    if year is not None and year not in available_years(dataset):
+        return JSONResponse({"error": f"Année indisponible : {year}"}, status_code=404)
+    return await _table_response(
+        request, [dataset_path(dataset, year)], {"dataset": dataset, "year": year},
+        lambda: load_dataset(dataset, year),
+    )
+
+
+async def balance(request):
+    try:
+        target_pci = _float_param(request, "target_pci", TARGET_PCI)
+        pci = {flow: value for flow in FLOWS if (value := _float_param(request, f"pci_{flow}")) is not None}
+    except BadRequest as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+
+    scenario = not is_reference(target_pci, pci)
+
+    def build():
+        df = run_scenario(target_pci, pci)["balance"] if scenario else load_dataset("balance")
+        return df.assign(
+            Classe=balance_class(df["Balance_Ener [GWh]"]).to_numpy(), Scenario=scenario
+        )
+
+    sources = scenario_sources() if scenario else [BALANCE_CSV]
+    return await _table_response(request, sources, {"target_pci": target_pci, "pci": pci}, build)
+
+
+async def locate(request):
+    try:
+        lat = _float_param(request, "lat")
+        lng = _float_param(request, "lng")
+    except BadRequest as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    if lat is None or lng is None:
+        return JSONResponse({"error": "Paramètres 'lat' et 'lng' requis"}, status_code=400)
+    canton = await run_in_threadpool(locate_canton, lat, lng)
+    return JSONResponse({"lat": lat, "lng": lng, "canton": canton})
+
+
+def _parse_bbox(value):
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in value.split(","))
+    except ValueError:
+        raise BadRequest("bbox attendu : min_lng,min_lat,max_lng,max_lat") from None
+    return min_lng, min_lat, max_lng, max_lat
+
+
+async def companies(request):
+    groups = sorted(request.query_params.getlist("group")) or None
+    canton = request.query_params.get("canton")
+    bbox = request.query_params.get("bbox")
+
+    def build():
+        df = load_companies()
+        mask = np.ones(len(df), dtype=bool)
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = _parse_bbox(bbox)
+            mask &= df["latitude"].between(min_lat, max_lat).to_numpy()
+            mask &= df["longitude"].between(min_lng, max_lng).to_numpy()
+        if groups:
+            mask &= df["Group"].isin(groups).to_numpy()
+        if canton:
+            mask &= (df["Cantons"] == canton).to_numpy()
+        return df[mask]
+
+    return await _table_response(
+        request, [COMPANIES_CSV], {"bbox": bbox, "groups": groups, "canton": canton}, build
+    )
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Données partagées chargées avant la première requête
+    await run_in_threadpool(load_shared)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/cantons/potentials", potentials),
+        Route("/cantons/balance", balance),
+        Route("/locate", locate),
+        Route("/companies", companies),
+    ],
+    middleware=[Middleware(GZipMiddleware, minimum_size=1024)],
+    lifespan=lifespan,
+)
@@ -0,0 +1,75 @@
+"""Classification vectorisée des valeurs cantonales en classes et couleurs.
+
+Une seule passe ``np.digitize`` sur toute la colonne remplace les boucles
+par entité (``style_function`` qui filtrait le DataFrame canton par canton).
+"""
+import numpy as np
+import pandas as pd
+from branca.utilities import color_brewer
+
+# 📌 Classes de la balance énergétique (intervalles [min, max[ en GWh)
+NO_INCINERATION = "Pas d'installation d'incinération"
+BALANCE_SEUILS = {
+    "Fortement déficitaire": (-float('inf'), -6),
+    "Moyennement déficitaire": (-6, -3),
+    "Faiblement déficitaire": (-3, 0),
+    "Faiblement excédentaire": (0, 3),
+    "Moyennement excédentaire": (3, 6),
+    "Fortement excédentaire": (6, float('inf'))
+}
+BALANCE_COLORS = {
+    "Fortement déficitaire": '#d73027',
+    "Moyennement déficitaire": '#fc8d59',
+    "Faiblement déficitaire": '#fee090',
+    "Faiblement excédentaire": '#e0f3f8',
+    "Moyennement excédentaire": '#91bfdb',
+    "Fortement excédentaire": '#4575b4',
+    NO_INCINERATION: '#ffffff'
+}
+
+
+def classify(values, thresholds, labels, missing=None):
+    """Associe à chaque valeur le libellé de son intervalle ``[seuil_i, seuil_i+1[``.
+
+    ``thresholds`` contient les bornes intérieures triées (``len(labels) - 1``
+    valeurs) : tout ce qui est sous la première borne prend ``labels[0]``, tout
+    ce qui est au-dessus de la dernière prend ``labels[-1]``. Les valeurs
+    manquantes prennent ``missing``.
+    """
+    if len(labels) != len(thresholds) + 1:
+        raise ValueError("Il faut exactement un libellé de plus que de seuils.")
+    values = pd.Series(values, dtype=float)
+    index = np.digitize(values.to_numpy(), np.asarray(thresholds, dtype=float), right=False)
+    result = np.asarray(labels, dtype=object)[index]
+    result[values.isna().to_numpy()] = missing
+    return pd.Series(result, index=values.index)
+
+
+def balance_class(values):
+    """Classe de balance énergétique de chaque valeur (GWh)."""
+    labels = list(BALANCE_SEUILS)
+    thresholds = [BALANCE_SEUILS[label][1] for label in labels[:-1]]
+    return classify(values, thresholds, labels, missing=NO_INCINERATION)
+
+
+def balance_color(values):
+    """Couleur de remplissage de la classe de balance de chaque valeur."""
+    return balance_class(values).map(BALANCE_COLORS)
+
+
+def bin_colors(values, bins, fill_color="YlOrRd", missing="#ffffff"):
+    """Couleur de chaque valeur pour des seuils de choroplèthe (même palette que ``folium.Choropleth``).
+
+    Comme dans Folium, les intervalles sont fermés à gauche (``[a, b[``) et la
+    dernière borne est incluse dans la dernière classe. Les valeurs hors des
+    seuils prennent la classe la plus proche.
+    """
+    colors = color_brewer(fill_color, n=len(bins) - 1)
+    values = pd.Series(values, dtype=float)
+    edges = np.asarray(bins, dtype=float)
+    # Même correction que Folium : la dernière borne devient inclusive
+    edges[-1] = np.nextafter(edges[-1], np.inf)
+    index = np.clip(np.digitize(values.to_numpy(), edges, right=False) - 1, 0, len(colors) - 1)
+    result = np.asarray(colors, dtype=object)[index]
+    result[values.isna().to_numpy()] = missing
+    return pd.Series(result, index=values.index)
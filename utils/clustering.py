@@ -0,0 +1,131 @@
+"""Index hiérarchique de points pour l'affichage des entreprises par fenêtre.
+
+Inspiré de *supercluster* : les points sont projetés en Web Mercator puis
+regroupés sur une grille dont la maille correspond à ``RADIUS_PX`` pixels à
+chaque niveau de zoom. Chaque niveau est construit à partir du niveau plus
+fin (agrégation vectorisée avec ``np.unique``/``np.bincount``). Une requête
+ne renvoie que les groupes ou points visibles dans la fenêtre courante, quel
+que soit le nombre total d'entreprises.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.data import COMPANIES_CSV, file_signature, load_companies
+
+# 📌 Au-delà de ce nombre d'entreprises filtrées, la page 1 passe en affichage par fenêtre
+CLUSTER_THRESHOLD = 5000
+
+MIN_ZOOM = 0
+MAX_ZOOM = 16
+RADIUS_PX = 40
+TILE_SIZE = 256
+
+
+def _project(lats, lngs):
+    """Coordonnées Web Mercator normalisées dans [0, 1]."""
+    x = np.asarray(lngs, dtype=float) / 360.0 + 0.5
+    sin = np.clip(np.sin(np.radians(np.asarray(lats, dtype=float))), -0.9999, 0.9999)
+    y = 0.5 - 0.25 * np.log((1 + sin) / (1 - sin)) / np.pi
+    return x, y
+
+
+class PointIndex:
+    """Groupes de points précalculés pour chaque niveau de zoom.
+
+    Pour chaque niveau, on garde des tableaux alignés : position moyenne
+    (``lat``, ``lng``), effectif ``count``, effectifs par groupe et indice d'un
+    point représentatif (utilisé quand le groupe ne contient qu'un point).
+    """
+
+    def __init__(self, df, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius=RADIUS_PX):
+        self.df = df.reset_index(drop=True)
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.group_codes, self.groups = pd.factorize(self.df["Group"].astype(str))
+
+        lats = self.df["latitude"].to_numpy(dtype=float)
+        lngs = self.df["longitude"].to_numpy(dtype=float)
+        x, y = _project(lats, lngs)
+        n = len(self.df)
+        # Niveau le plus fin : un « groupe » par entreprise
+        level = {
+            "x": x, "y": y, "lat": lats, "lng": lngs,
+            "count": np.ones(n),
+            "groups": np.eye(len(self.groups))[self.group_codes] if n else np.zeros((0, len(self.groups))),
+            "point": np.arange(n),
+        }
+        self.levels = {max_zoom + 1: level}
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            level = self._cluster(level, radius / (TILE_SIZE * 2 ** zoom))
+            self.levels[zoom] = level
+
+    @staticmethod
+    def _cluster(level, cell):
+        """Regroupe les éléments d'un niveau sur une grille de maille ``cell``."""
+        cx = np.floor(level["x"] / cell).astype(np.int64)
+        cy = np.floor(level["y"] / cell).astype(np.int64)
+        _, inverse = np.unique(cx * (2 ** 31) + cy, return_inverse=True)
+        size = inverse.max() + 1 if len(inverse) else 0
+        count = np.bincount(inverse, weights=level["count"], minlength=size)
+
+        def mean(values):
+            return np.bincount(inverse, weights=values * level["count"], minlength=size) / count
+
+        groups = np.zeros((size, level["groups"].shape[1]))
+        np.add.at(groups, inverse, level["groups"])
+        point = np.full(size, np.iinfo(np.int64).max)
+        np.minimum.at(point, inverse, level["point"])
+        return {
+            "x": mean(level["x"]), "y": mean(level["y"]),
+            "lat": mean(level["lat"]), "lng": mean(level["lng"]),
+            "count": count, "groups": groups, "point": point,
+        }
+
+    def query(self, bounds, zoom, padding=0.1):
+        """Groupes et points visibles dans ``bounds`` au niveau ``zoom``.
+
+        ``bounds`` suit le format renvoyé par ``st_folium`` (``_southWest`` /
+        ``_northEast``). La fenêtre est élargie de ``padding`` pour éviter les
+        bords vides lors d'un petit déplacement.
+        """
+        zoom = int(np.clip(round(zoom if zoom is not None else self.min_zoom), self.min_zoom, self.max_zoom + 1))
+        level = self.levels[zoom]
+        south, west = bounds["_southWest"]["lat"], bounds["_southWest"]["lng"]
+        north, east = bounds["_northEast"]["lat"], bounds["_northEast"]["lng"]
+        pad_lat, pad_lng = (north - south) * padding, (east - west) * padding
+        visible = (
+            (level["lat"] >= south - pad_lat) & (level["lat"] <= north + pad_lat)
+            & (level["lng"] >= west - pad_lng) & (level["lng"] <= east + pad_lng)
+        )
+        count = level["count"][visible].astype(int)
+        groups = level["groups"][visible]
+        dominant = np.asarray(self.groups, dtype=object)[groups.argmax(axis=1)] if len(groups) else np.array([], dtype=object)
+
+        result = pd.DataFrame({
+            "latitude": level["lat"][visible],
+            "longitude": level["lng"][visible],
+            "count": count,
+            "Group": dominant,
+        })
+        # Libellé : nom de l'entreprise pour un point isolé, effectif pour un groupe
+        single = count == 1
+        points = self.df.iloc[level["point"][visible][single]]
+        labels = np.array([f"{n} entreprises" for n in count], dtype=object)
+        labels[single] = (points["Companies"].astype(str) + " - " + points["Cities"].astype(str) + " (" + points["Group"].astype(str) + ")").to_numpy()
+        result["label"] = labels
+        return result
+
+
+@lru_cache(maxsize=64)
+def _cached_index(signature, canton, groups):
+    from utils.maps import filter_companies
+
+    return PointIndex(filter_companies(load_companies(), canton, list(groups) if groups is not None else None))
+
+
+def get_point_index(canton="Tous", groups=None):
+    """Index des entreprises filtrées, construit une fois par état de filtres."""
+    groups = tuple(sorted(groups)) if groups is not None else None
+    return _cached_index(file_signature(COMPANIES_CSV), canton, groups)
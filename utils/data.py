@@ -0,0 +1,180 @@
+"""Couche de chargement des données partagée par toutes les pages.
+
+Chaque fichier n'est lu et converti qu'une seule fois par processus. Le cache
+est indexé par (chemin, mtime, taille) : une mise à jour d'un fichier dans
+``data/`` est donc prise en compte au rerun suivant, sans redémarrer le serveur.
+Les sources sont lues depuis leur version normalisée de ``data/store/``
+(voir ``utils.store``) ; le CSV n'est parsé que si cette version manque.
+"""
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from utils.store import load_or_build
+
+# 📌 Copy-on-Write : les DataFrames dérivés (merge, filtres, colonnes ajoutées)
+# ne peuvent plus modifier les objets gardés en cache.
+pd.options.mode.copy_on_write = True
+
+# 📌 Chemins des fichiers
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+COMPANIES_CSV = DATA_DIR / "Companies_geocoded_all_unique_corrected.csv"
+POTENTIEL_TOT_CSV = DATA_DIR / "Potentiel_Ener_Tot_GWh.csv"
+POTENTIEL_RES_CSV = DATA_DIR / "Potentiel_Ener_Res_GWh.csv"
+BALANCE_CSV = DATA_DIR / "Balances_Ener_01_04.csv"
+CANTONS_GEOJSON = DATA_DIR / "cantons.geojson"
+# Quantités déclarées par entreprise (OMoD ; Quantities_XX [Kg]), optionnel
+COMPANY_QUANTITIES_CSV = DATA_DIR / "Companies_quantities.csv"
+
+# 📌 Séries annuelles : une partition par année, ``data/years/<année>/``, avec les
+# mêmes noms de fichiers que l'instantané courant de ``data/``
+YEARS_DIR = DATA_DIR / "years"
+
+# Colonnes énergétiques des fichiers de potentiel
+ENERGY_COLUMNS = ["Pot_Ener_01 [GWh]", "Pot_Ener_04 [GWh]", "Pot_Ener_08 [GWh]", "Pot_Ener_11 [GWh]", "Pot_Ener [GWh]"]
+
+_cache = {}
+_lock = threading.RLock()
+
+
+def file_signature(path):
+    """Signature (chemin, mtime, taille) utilisée comme clé d'invalidation."""
+    stat = os.stat(path)
+    return (str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def cached_resource(name, path, builder):
+    """Objet partagé ``builder(path)``, reconstruit seulement si le fichier a changé.
+
+    ``path`` peut aussi être une liste de fichiers : l'objet est reconstruit
+    dès que l'un d'eux change. Contrairement aux ``load_*``, l'objet retourné
+    n'est pas copié : il doit être traité en lecture seule par l'appelant.
+    """
+    signature = tuple(file_signature(source) for source in (path if isinstance(path, list) else [path]))
+    with _lock:
+        entry = _cache.get(name)
+        if entry is None or entry[0] != signature:
+            entry = (signature, builder(path))
+            _cache[name] = entry
+    return entry[1]
+
+
+def _cached(path, parser, geo=False):
+    """Retourne le résultat de ``parser(path)`` en cache tant que le fichier n'a pas changé."""
+    df = cached_resource(str(path), path, lambda source: load_or_build(source, parser, geo=geo))
+    # Copie superficielle : grâce au Copy-on-Write, toute modification faite
+    # par une page se fait sur sa propre copie et jamais sur l'objet en cache.
+    return df.copy(deep=False)
+
+
+def prime_cache(path, df):
+    """Installe ``df`` comme contenu en cache de ``path`` (benchmarks sur données synthétiques).
+
+    L'entrée est servie par les ``load_*`` tant que le fichier réel ne change
+    pas ; ``clear_cache()`` la retire.
+    """
+    with _lock:
+        _cache[str(path)] = ((file_signature(path),), df)
+
+
+def clear_cache():
+    """Vide le cache (utile pour les tests et benchmarks à froid)."""
+    with _lock:
+        _cache.clear()
+
+
+def _parse_companies(path):
+    return pd.read_csv(path)
+
+
+def _parse_potentiel(path):
+    df = pd.read_csv(path, sep=";", decimal=",", engine="python", encoding="utf-8-sig")
+    for col in ENERGY_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    df["Cantons"] = df["Cantons"].astype(str)
+    return df
+
+
+def _parse_company_quantities(path):
+    df = pd.read_csv(path, sep=";", decimal=",", engine="python", encoding="utf-8-sig")
+    quantity_cols = [col for col in df.columns if col.startswith("Quantities_")]
+    df[quantity_cols] = df[quantity_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+    return df
+
+
+def _parse_balance(path):
+    df = pd.read_csv(path, sep=";", decimal=",", engine="python", encoding="utf-8-sig")
+    df["Cantons"] = df["Cantons"].astype(str)
+    df["Balance_Ener [GWh]"] = pd.to_numeric(df["Balance_Ener [GWh]"], errors="coerce")
+    return df
+
+
+def _parse_cantons(path):
+    import geopandas as gpd
+
+    gdf = gpd.read_file(path)
+    gdf["id"] = gdf["id"].astype(str)
+    return gdf
+
+
+def load_companies():
+    """Entreprises géocodées (une ligne par site)."""
+    return _cached(COMPANIES_CSV, _parse_companies)
+
+
+def load_potentiel_total():
+    """Potentiel énergétique total par canton, colonnes énergétiques en float."""
+    return _cached(POTENTIEL_TOT_CSV, _parse_potentiel)
+
+
+def load_potentiel_residuel():
+    """Potentiel énergétique résiduel par canton, colonnes énergétiques en float."""
+    return _cached(POTENTIEL_RES_CSV, _parse_potentiel)
+
+
+def load_company_quantities():
+    """Quantités par entreprise et par flux (``FileNotFoundError`` si le fichier n'est pas fourni)."""
+    return _cached(COMPANY_QUANTITIES_CSV, _parse_company_quantities)
+
+
+def load_balance():
+    """Balance énergétique flux 04 / flux 01 par canton."""
+    return _cached(BALANCE_CSV, _parse_balance)
+
+
+# 📌 Jeux de données disponibles par année (nom du fichier, fonction de lecture)
+DATASETS = {
+    "total": (POTENTIEL_TOT_CSV.name, _parse_potentiel),
+    "residuel": (POTENTIEL_RES_CSV.name, _parse_potentiel),
+    "balance": (BALANCE_CSV.name, _parse_balance),
+    "quantities": (COMPANY_QUANTITIES_CSV.name, _parse_company_quantities),
+}
+
+
+def dataset_path(name, year=None):
+    """Fichier du jeu ``name`` pour ``year`` (instantané courant si ``year`` est ``None``)."""
+    filename = DATASETS[name][0]
+    return DATA_DIR / filename if year is None else YEARS_DIR / str(year) / filename
+
+
+def available_years(name):
+    """Années pour lesquelles le jeu ``name`` a une partition, dans l'ordre croissant."""
+    if not YEARS_DIR.is_dir():
+        return []
+    filename = DATASETS[name][0]
+    return sorted(
+        int(folder.name) for folder in YEARS_DIR.iterdir()
+        if folder.name.isdigit() and (folder / filename).exists()
+    )
+
+
+def load_dataset(name, year=None):
+    """Jeu ``name`` de l'année ``year`` (ou de l'instantané courant), en cache par partition."""
+    return _cached(dataset_path(name, year), DATASETS[name][1])
+
+
+def load_cantons():
+    """Géométries des cantons (GeoDataFrame avec les colonnes ``id`` et ``name``)."""
+    return _cached(CANTONS_GEOJSON, _parse_cantons, geo=True)
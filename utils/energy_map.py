@@ -0,0 +1,218 @@
+"""Carte énergétique unifiée : potentiel total, potentiel résiduel et balance.
+
+Les trois indicateurs partagent la même géométrie : la topologie simplifiée
+est embarquée une seule fois dans la page et décodée une seule fois dans le
+navigateur. Chaque entité porte un tableau de valeurs et de couleurs par
+indicateur ; changer de couche (contrôle Leaflet) ne fait qu'afficher une autre
+couche construite sur les mêmes entités, sans aller-retour vers le serveur.
+Les pages d'un seul indicateur utilisent la même carte, limitée à leur couche.
+La géométrie embarquée est celle d'un seul niveau de simplification, choisi
+pour le zoom initial : zoomer ne change pas de niveau (voir
+``utils.energy_page.render_energy_page``).
+Aux paramètres de référence, les valeurs sont celles des fichiers fournis ;
+sinon elles viennent du modèle de mélange (scénario, voir ``utils.scenario``).
+"""
+import html
+import math
+
+import folium
+import pandas as pd
+from branca.element import MacroElement
+from branca.utilities import color_brewer
+from folium.elements import JSCSSMixin
+from folium.template import Template
+from folium.utilities import javascript_identifier_path_to_array_notation
+
+from utils.classification import BALANCE_COLORS, BALANCE_SEUILS, NO_INCINERATION, balance_color, bin_colors
+from utils.data import dataset_path, load_cantons, load_dataset
+from utils.geometry import OBJECT_PATH, cantons_topojson
+from utils.scenario import TARGET_PCI, is_reference, run_scenario, scenario_sources
+
+# 📌 Seuils des choroplèthes de potentiel (GWh)
+TOTAL_BINS = [0, 5, 10, 20, 40, 80, 130, 180, 230, 280, 320, 370, 420, 470, 520, 570, 620]
+RESIDUEL_BINS = [0, 5, 10, 15, 20, 25, 30, 35, 40]
+
+# 📌 Couches disponibles, dans l'ordre du contrôle de couches
+LAYERS = {
+    "total": {"label": "Potentiel total", "column": "Pot_Ener [GWh]", "bins": TOTAL_BINS},
+    "residuel": {"label": "Potentiel résiduel", "column": "Pot_Ener [GWh]", "bins": RESIDUEL_BINS},
+    "balance": {"label": "Balance énergétique", "column": "Balance_Ener [GWh]", "bins": None},
+}
+
+
+def layer_sources(year=None):
+    """Fichiers lus par la carte pour ``year`` (fichiers fournis et sources des scénarios, ceux qui existent)."""
+    paths = [dataset_path(key, year) for key in LAYERS] + scenario_sources(year)
+    return [path for path in dict.fromkeys(paths) if path.exists()]
+
+
+def layer_frames(year=None, target_pci=TARGET_PCI, pci=None):
+    """Table de chaque indicateur : fichiers fournis, ou scénario recalculé hors référence.
+
+    Un indicateur absent de la partition de ``year`` vaut ``None`` ; un
+    scénario sans partition ``total`` (quantités) n'a aucun indicateur.
+    """
+    if is_reference(target_pci, pci):
+        return {key: load_dataset(key, year) if dataset_path(key, year).exists() else None for key in LAYERS}
+    if not dataset_path("total", year).exists():
+        return dict.fromkeys(LAYERS)
+    return run_scenario(target_pci, pci, year)
+
+
+def layer_values(frames):
+    """Valeur de chaque indicateur par canton (index ``id`` des cantons de la carte).
+
+    Un indicateur sans table (``None``) reste vide (NaN).
+    """
+    values = load_cantons()[["id"]].set_index("id")
+    for key, layer in LAYERS.items():
+        if frames.get(key) is None:
+            values[key] = float("nan")
+            continue
+        column = frames[key].set_index("Cantons")[layer["column"]]
+        values[key] = column.reindex(values.index)
+    # Un canton absent des tables de potentiel vaut 0 GWh
+    values[["total", "residuel"]] = values[["total", "residuel"]].fillna(0)
+    return values
+
+
+def layer_bins(key, values=None):
+    """Seuils d'une couche de potentiel, prolongés d'une classe si un scénario dépasse le dernier."""
+    bins = list(LAYERS[key]["bins"])
+    if values is not None and values.max() > bins[-1]:
+        bins.append(math.ceil(values.max()))
+    return bins
+
+
+def layer_colors(values):
+    """Couleur de remplissage de chaque canton pour chaque indicateur."""
+    colors = values.copy()
+    for key in values.columns:
+        if LAYERS[key]["bins"] is None:
+            colors[key] = balance_color(values[key]).to_numpy()
+        else:
+            colors[key] = bin_colors(values[key], layer_bins(key, values[key])).to_numpy()
+    return colors
+
+
+def _legend_row(color, text):
+    return (
+        f'<div><i style="display:inline-block;width:18px;height:12px;margin-right:6px;'
+        f'border:1px solid #555;background:{color}"></i>{html.escape(text)}</div>'
+    )
+
+
+def layer_legend(key, bins=None):
+    """Légende HTML d'une couche (affichée dans la carte quand la couche est active)."""
+    layer = LAYERS[key]
+    rows = [f"<b>{html.escape(layer['label'])} (GWh)</b>"]
+    if layer["bins"] is None:
+        for label, (low, high) in reversed(BALANCE_SEUILS.items()):
+            if low == -float("inf"):
+                text = f"< {high}"
+            elif high == float("inf"):
+                text = f"≥ {low}"
+            else:
+                text = f"[{low}, {high}["
+            rows.append(_legend_row(BALANCE_COLORS[label], f"{label} ({text})"))
+        rows.append(_legend_row(BALANCE_COLORS[NO_INCINERATION], NO_INCINERATION))
+    else:
+        bins = bins or layer["bins"]
+        colors = color_brewer("YlOrRd", n=len(bins) - 1)
+        for color, low, high in zip(colors, bins[:-1], bins[1:]):
+            rows.append(_legend_row(color, f"{low} – {high}"))
+    return "".join(rows)
+
+
+class EnergyLayers(JSCSSMixin, MacroElement):
+    """Couches d'indicateurs construites sur une seule topologie décodée une fois."""
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+        (function() {
+            var map = {{ this._parent.get_name() }};
+            var topology = {{ this.topology|tojson }};
+            var features = topojson.feature(topology, topology{{ this.object_path }});
+            var metrics = {{ this.metrics|tojson }};
+            var layers = {};
+
+            var legend = L.control({position: "bottomright"});
+            legend.onAdd = function() {
+                this._div = L.DomUtil.create("div", "info legend");
+                this._div.style.cssText = "background:white;padding:6px 8px;font:12px sans-serif;"
+                    + "box-shadow:0 0 15px rgba(0,0,0,0.2);border-radius:5px;";
+                return this._div;
+            };
+            legend.addTo(map);
+
+            metrics.forEach(function(metric) {
+                var layer = L.geoJson(features, {
+                    style: function(feature) {
+                        return {
+                            fillColor: feature.properties.colors[metric.key],
+                            fillOpacity: 0.6, color: "black", weight: 1, opacity: 0.3
+                        };
+                    },
+                    onEachFeature: function(feature, featureLayer) {
+                        var value = feature.properties.values[metric.key];
+                        var text = value === null || value === undefined ? "n.d." : value.toFixed(2) + " GWh";
+                        featureLayer.bindTooltip(feature.properties.id + " – " + metric.label + " : " + text);
+                    }
+                });
+                layer.metric = metric;
+                layers[metric.label] = layer;
+            });
+
+            map.on("baselayerchange", function(e) {
+                if (e.layer.metric) { legend._div.innerHTML = e.layer.metric.legend; }
+            });
+            if (metrics.length > 1) {
+                L.control.layers(layers, null, {collapsed: false}).addTo(map);
+            }
+            layers[metrics[0].label].addTo(map);
+            legend._div.innerHTML = metrics[0].legend;
+        })();
+        {% endmacro %}
+        """
+    )
+
+    default_js = [
+        (
+            "topojson",
+            "https://cdnjs.cloudflare.com/ajax/libs/topojson/1.6.9/topojson.min.js",
+        ),
+    ]
+
+    def __init__(self, topology, metrics):
+        super().__init__()
+        self._name = "EnergyLayers"
+        self.topology = topology
+        self.object_path = javascript_identifier_path_to_array_notation(OBJECT_PATH)
+        self.metrics = metrics
+
+
+def build_energy_map(geometry_level, zoom_start=8, year=None, layers=None, target_pci=TARGET_PCI, pci=None):
+    """Carte Folium avec les indicateurs ``layers`` (tous par défaut) en couches commutables."""
+    layers = list(layers or LAYERS)
+    values = layer_values(layer_frames(year, target_pci, pci))[layers]
+    colors = layer_colors(values)
+    properties = {
+        canton: {
+            "values": {key: (None if pd.isna(value) else round(float(value), 4)) for key, value in values.loc[canton].items()},
+            "colors": colors.loc[canton].to_dict(),
+        }
+        for canton in values.index
+    }
+    metrics = [
+        {
+            "key": key,
+            "label": LAYERS[key]["label"],
+            "legend": layer_legend(key, None if LAYERS[key]["bins"] is None else layer_bins(key, values[key])),
+        }
+        for key in layers
+    ]
+
+    m = folium.Map(location=[46.8182, 8.2275], zoom_start=zoom_start, tiles="CartoDB positron")
+    EnergyLayers(cantons_topojson(geometry_level, properties), metrics).add_to(m)
+    return m
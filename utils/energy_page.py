@@ -0,0 +1,236 @@
+"""Pages de carte énergétique : potentiel total, potentiel résiduel et balance.
+
+Les pages 2 à 5 ne diffèrent que par les couches affichées. Le chargement des
+données, la carte (``utils.energy_map``, en cache), la résolution du clic et
+le panneau latéral sont définis ici une seule fois ; chaque page se réduit à
+son titre et à sa liste de couches. La page de la balance y ajoute la
+répartition des flux du mélange entre remettants et installations
+(``utils.allocation``) pour le scénario courant, celle du potentiel total
+l'agrégat des potentiels par commune, district ou canton (``utils.aggregation``).
+
+Aux paramètres de référence, carte et panneau affichent les fichiers fournis.
+Dès qu'un paramètre du scénario change, les valeurs viennent du modèle de
+mélange (``utils.scenario``) et sont présentées comme un scénario.
+"""
+import pandas as pd
+import streamlit as st
+from streamlit_folium import st_folium
+
+from utils.aggregation import FLOWS, PCI_MJ_KG, QUANTITY_COLUMNS, TOTAL_COLUMN, compute_potentials, get_rollup, rollup
+from utils.allocation import ESTIMATE_NOTE, allocate, quantities_declared
+from utils.data import CANTONS_GEOJSON, available_years, load_potentiel_total
+from utils.energy_map import LAYERS, build_energy_map, layer_sources
+from utils.geometry import level_for_zoom
+from utils.map_cache import artifact_key, map_cache
+from utils.profiling import page_profiler
+from utils.scenario import TARGET_PCI, is_reference, reference_gaps
+from utils.spatial import locate_canton
+from utils.summary import get_scenario_summaries, summary_figure
+
+# 📌 Zoom initial et niveau de simplification des géométries correspondant
+ZOOM_START = 8
+
+# 📌 Libellés des niveaux administratifs de l'agrégat
+LEVEL_LABELS = {"commune": "Commune", "district": "District", "canton": "Canton"}
+
+
+def scenario_controls():
+    """PCI cible du mélange et PCI des flux (valeurs de référence par défaut)."""
+    with st.sidebar.expander("⚙️ Scénario", expanded=False):
+        target_pci = st.slider("PCI cible du mélange (MJ/kg)", 6.0, 21.0, TARGET_PCI, 0.5)
+        pci = {
+            flow: st.number_input(f"PCI du flux {flow} (MJ/kg)", value=PCI_MJ_KG[flow], step=0.1, format="%.3f")
+            for flow in FLOWS
+        }
+    return target_pci, pci
+
+
+def year_control(layers):
+    """Année affichée : instantané courant ou partition annuelle de ``data/years/``."""
+    years = sorted(set().union(*(available_years(key) for key in layers)))
+    if not years:
+        return None, years
+    choice = st.sidebar.select_slider("Année", options=years + ["Actuel"], value="Actuel")
+    return (None if choice == "Actuel" else choice), years
+
+
+def show_scenario_caption(target_pci, layers):
+    """Avertit que les valeurs affichées sont un scénario recalculé, pas les fichiers fournis."""
+    gaps = reference_gaps()
+    cantons = sorted(set(gaps.loc[gaps["indicateur"].isin(layers), "Cantons"]))
+    caption = (
+        f"🧪 Scénario (PCI cible {target_pci:g} MJ/kg) : valeurs recalculées par le modèle de mélange "
+        "depuis les quantités par canton, et non lues dans les fichiers fournis. "
+        "Revenez aux paramètres de référence pour afficher les fichiers."
+    )
+    if cantons:
+        caption += f" Même aux paramètres de référence, le modèle s'écarte des fichiers pour : {', '.join(cantons)}."
+    st.caption(caption)
+
+
+def show_potential(summary):
+    if summary is None:
+        st.info("Pas de données de potentiel pour ce canton.")
+        return
+    st.plotly_chart(summary_figure(summary), use_container_width=True)
+    st.markdown(f"**Potentiel cantonal : {summary['total']:.2f} GWh**")
+
+
+def show_balance(summary):
+    if summary is None:
+        st.info("Pas de données de balance pour ce canton.")
+    elif pd.isna(summary["balance"]):
+        st.markdown(f"**{summary['classe']}**")
+    else:
+        st.markdown(f"**{summary['balance']:.2f} GWh**")
+        st.markdown(f"*{summary['classe']}*")
+
+
+def show_allocation(target_pci, pci, canton=None, year=None):
+    """Répartition des flux du mélange (instantané courant) : réception par installation et transferts."""
+    st.subheader("Répartition des flux du mélange entre remettants et installations")
+    if not quantities_declared():
+        st.caption("⚠️ " + ESTIMATE_NOTE)
+    if year is not None:
+        st.caption("La répartition porte sur l'instantané courant, pas sur l'année affichée.")
+    result = allocate(target_pci, pci)
+    flows, facilities, unallocated = result["flows"], result["facilities"], result["unallocated"]
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Transport", f"{result['cost']:,.0f} t·km".replace(",", " "))
+    col2.metric("Transferts", len(flows))
+    col3.metric("Non placé", f"{unallocated.filter(like='Quantities_').to_numpy().sum() / 1000:,.1f} t".replace(",", " "))
+
+    # Installations qui reçoivent du mélange, puis transferts (du canton sélectionné s'il y en a un)
+    received = facilities[facilities["Quantity [Kg]"] > 0].drop(columns=["latitude", "longitude"])
+    if canton:
+        flows = flows[flows["Cantons"] == canton]
+    tab1, tab2 = st.tabs(["Installations", "Transferts" + (f" depuis {canton}" if canton else "")])
+    with tab1:
+        st.dataframe(received.sort_values("Quantity [Kg]", ascending=False), hide_index=True, height=250)
+    with tab2:
+        st.dataframe(flows.sort_values("Quantity [Kg]", ascending=False), hide_index=True, height=250)
+
+
+def level_table(level, pci):
+    """Potentiels agrégés au niveau ``level`` pour les PCI ``pci``, ou ``None`` avec la raison s'il est indisponible."""
+    if not quantities_declared():
+        if level != "canton":
+            return None, (
+                f"Résolution « {LEVEL_LABELS[level]} » indisponible : elle demande les quantités déclarées "
+                "par entreprise (`data/Companies_quantities.csv`), qui ne sont pas fournies."
+            )
+        # Sans quantités par entreprise, les quantités par canton du fichier de potentiel total
+        return rollup(load_potentiel_total()[["Cantons"] + QUANTITY_COLUMNS], "canton", pci), None
+    try:
+        table = get_rollup(level)
+    except ValueError as exc:
+        return None, f"Résolution « {LEVEL_LABELS[level]} » indisponible : {exc}."
+    return compute_potentials(table, pci), None
+
+
+def show_rollup(pci, canton=None, year=None):
+    """Potentiels agrégés par commune, district ou canton, au choix de l'utilisateur."""
+    st.subheader("Potentiel par niveau administratif")
+    level = st.radio(
+        "Résolution", list(LEVEL_LABELS), index=list(LEVEL_LABELS).index("canton"),
+        format_func=LEVEL_LABELS.get, horizontal=True
+    )
+    if year is not None:
+        st.caption("L'agrégat porte sur l'instantané courant, pas sur l'année affichée.")
+    table, reason = level_table(level, pci)
+    if table is None:
+        st.info(reason)
+        return
+    if not quantities_declared():
+        st.caption("Quantités par canton du fichier de potentiel total (pas de quantités déclarées par entreprise).")
+    if canton and level != "canton":
+        table = table[table["Cantons"] == canton]
+    st.dataframe(table.sort_values(TOTAL_COLUMN, ascending=False), hide_index=True, height=300)
+
+
+def render_energy_page(page, layers, allocation=False, levels=False):
+    """Carte des couches ``layers``, recherche / clic d'un canton et panneau de ses indicateurs.
+
+    Avec ``allocation``, la page affiche aussi la répartition des flux du
+    mélange pour le scénario courant (voir ``show_allocation``) ; avec
+    ``levels``, les potentiels agrégés par niveau administratif (voir
+    ``show_rollup``).
+
+    Retourne la liste des années disponibles (vide sans partition annuelle).
+    """
+    profiler = page_profiler(page)
+    target_pci, pci = scenario_controls()
+    reference = is_reference(target_pci, pci)
+    year, all_years = year_control(layers)
+
+    # 📌 Résumés par canton : fichiers fournis, ou scénario (en cache par jeu de paramètres)
+    with profiler.stage("load"):
+        summaries = {key: get_scenario_summaries(target_pci, pci, year)[key] for key in layers}
+
+    # 📌 Une seule carte (et une seule géométrie) pour toutes les couches de la page.
+    # Le niveau est choisi une fois pour le zoom initial et ne change pas quand l'utilisateur zoome :
+    # la carte est un iframe statique, changer de niveau sur ``zoomend`` demanderait d'y embarquer
+    # tous les niveaux (~200 Ko au lieu de ~42 Ko pour « medium »). Au-delà du zoom 10, les
+    # frontières gardent donc une simplification d'environ 200 m.
+    geometry_level = level_for_zoom(ZOOM_START)
+    with profiler.stage("map_build"):
+        m = map_cache.get_map(
+            artifact_key(
+                "carte_energetique", layer_sources(year) + [CANTONS_GEOJSON],
+                layers={key: LAYERS[key] for key in layers}, geometry_level=geometry_level, year=year,
+                scenario=None if reference else [target_pci, pci]
+            ),
+            lambda: build_energy_map(
+                geometry_level, zoom_start=ZOOM_START, year=year, layers=layers, target_pci=target_pci, pci=pci
+            )
+        )
+
+    # 📌 Zone de recherche manuelle d'un canton
+    selected_canton = st.text_input("🔎 Rechercher un canton (ou cliquez sur la carte) :", "")
+
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        # 📌 Le changement de couche se fait dans le navigateur : seuls les clics reviennent au serveur
+        with profiler.stage("render"):
+            map_data = st_folium(m, width=900, height=600, returned_objects=["last_clicked"])
+        profiler.set_payload(m)
+        if not reference:
+            show_scenario_caption(target_pci, layers)
+
+        if map_data and map_data.get("last_clicked"):
+            click_info = map_data["last_clicked"]
+            click_lat = click_info.get("lat")
+            click_lng = click_info.get("lng")
+            if click_lat is not None and click_lng is not None:
+                # Index spatial partagé (tolérance d'environ 1 km pour les clics proches des limites)
+                with profiler.stage("click"):
+                    clicked = locate_canton(click_lat, click_lng)
+                if clicked is not None:
+                    selected_canton = clicked
+                else:
+                    st.warning("Aucun canton trouvé pour le clic.")
+
+    with col2:
+        known_cantons = set().union(*summaries.values())
+        if selected_canton and selected_canton in known_cantons:
+            st.markdown(f"### {selected_canton}" + ("" if reference else " (scénario)"))
+            tabs = st.tabs([LAYERS[key]["label"] for key in layers]) if len(layers) > 1 else [st.container()]
+            for tab, key in zip(tabs, layers):
+                with tab:
+                    summary = summaries[key].get(selected_canton)
+                    show_balance(summary) if key == "balance" else show_potential(summary)
+        else:
+            st.info("Cliquez sur un canton sur la carte ou utilisez la recherche pour sélectionner un canton.")
+
+    canton = selected_canton if selected_canton in known_cantons else None
+    if allocation:
+        with profiler.stage("allocation"):
+            show_allocation(target_pci, pci, canton, year)
+    if levels:
+        with profiler.stage("rollup"):
+            show_rollup(pci, canton, year)
+
+    profiler.finish()
+    return all_years
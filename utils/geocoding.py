@@ -0,0 +1,238 @@
+"""Géocodage hors ligne des adresses d'entreprises.
+
+Les adresses (``Zip_codes``, ``Cities``, ``Streets``) sont normalisées en une
+clé stable, puis résolues contre une table de référence locale (centroïdes de
+rues et de NPA). Les résultats sont gardés dans un cache SQLite indexé par
+clé normalisée et par version de la table de référence : lors d'un
+rafraîchissement du registre, seules les adresses nouvelles ou modifiées sont
+géocodées, et une nouvelle table de référence invalide les résultats obtenus
+avec l'ancienne. Les adresses introuvables ne sont pas gardées : elles sont
+de nouveau cherchées au passage suivant.
+"""
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.data import file_signature
+
+CACHE_FILE = Path(__file__).resolve().parent.parent / ".cache" / "geocoding.sqlite"
+
+# Au-delà de ce nombre de lignes, la normalisation est répartie sur plusieurs processus
+PARALLEL_THRESHOLD = 200_000
+
+# 📌 Abréviations courantes dans les adresses suisses
+ABBREVIATIONS = {
+    r"\bstr\b": "strasse",
+    r"(?<=[a-z])str\b": "strasse",
+    r"\brte\b": "route",
+    r"\bch\b": "chemin",
+    r"\bav\b": "avenue",
+    r"\bbd\b": "boulevard",
+}
+
+
+def normalize_text(values):
+    """Minuscules, sans accents ni ponctuation, espaces simples (vectorisé)."""
+    text = (
+        pd.Series(values, dtype="string")
+        .fillna("")
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+    )
+    for pattern, replacement in ABBREVIATIONS.items():
+        text = text.str.replace(pattern, replacement, regex=True)
+    return text.str.strip()
+
+
+def normalize_street(values):
+    """Nom de rue normalisé, sans numéro (« Rue du Temps 8 » → « rue du temps »)."""
+    street = normalize_text(values).str.replace(r"\b\d+[a-z]?\b", " ", regex=True)
+    return street.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def _address_keys(frame):
+    # Les registres répètent beaucoup les mêmes rues : on ne normalise que les valeurs distinctes
+    codes, streets = pd.factorize(frame["Streets"].astype("string").fillna(""))
+    normalized = normalize_street(streets).to_numpy(dtype=object)[codes]
+    zip_codes = pd.Series(frame["Zip_codes"]).astype("string").str.strip().fillna("")
+    return (zip_codes.to_numpy(dtype=object) + "|" + normalized).astype(object)
+
+
+def address_keys(df, workers=None):
+    """Clé normalisée « NPA|rue » de chaque ligne, en parallèle pour les gros volumes."""
+    frame = df[["Zip_codes", "Streets"]]
+    if not workers or workers < 2 or len(frame) < PARALLEL_THRESHOLD:
+        return _address_keys(frame)
+    chunks = np.array_split(np.arange(len(frame)), workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(_address_keys, [frame.iloc[chunk] for chunk in chunks])
+        return np.concatenate(list(parts))
+
+
+class ReferenceIndex:
+    """Table de référence indexée en mémoire (centroïdes par rue et par NPA).
+
+    Le fichier de référence contient au moins ``Zip_codes``, ``latitude`` et
+    ``longitude`` ; la colonne ``Streets`` est optionnelle (centroïdes de NPA seuls).
+    ``signature`` identifie la version de la table dans le cache des adresses.
+    """
+
+    def __init__(self, reference, signature=""):
+        self.signature = signature
+        reference = reference.dropna(subset=["latitude", "longitude"])
+        coords = ["latitude", "longitude"]
+        if "Streets" in reference.columns:
+            keyed = reference.assign(key=_address_keys(reference))
+            self.streets = keyed.groupby("key")[coords].mean()
+        else:
+            self.streets = pd.DataFrame(columns=coords, dtype=float)
+        zip_codes = reference["Zip_codes"].astype("string").str.strip()
+        self.postcodes = reference.assign(zip=zip_codes).groupby("zip")[coords].mean()
+
+    @classmethod
+    def from_csv(cls, path):
+        signature = "|".join(str(part) for part in file_signature(path))
+        return cls(pd.read_csv(path, sep=None, engine="python", encoding="utf-8-sig"), signature)
+
+    def resolve(self, keys):
+        """Coordonnées et précision (« street », « postcode » ou ``None``) de chaque clé."""
+        keys = pd.Index(keys, dtype=object)
+        result = pd.DataFrame(index=keys, columns=["latitude", "longitude"], dtype=float)
+        result["precision"] = None
+
+        street = self.streets.reindex(keys)
+        found = street["latitude"].notna().to_numpy()
+        result.loc[found, ["latitude", "longitude"]] = street[found].to_numpy()
+        result.loc[found, "precision"] = "street"
+
+        zip_codes = pd.Series(keys).str.split("|", n=1).str[0]
+        postcode = self.postcodes.reindex(zip_codes)
+        fallback = ~found & postcode["latitude"].notna().to_numpy()
+        result.loc[fallback, ["latitude", "longitude"]] = postcode[fallback].to_numpy()
+        result.loc[fallback, "precision"] = "postcode"
+        return result
+
+
+class AddressCache:
+    """Cache persistant des adresses déjà géocodées (SQLite, clé normalisée et version de la référence).
+
+    Les coordonnées reprises du registre (``seed``) ne dépendent d'aucune
+    table de référence : elles sont gardées avec une version vide.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(geocodes)")]
+            if columns and "reference" not in columns:
+                # Ancien format (sans version de la référence, échecs gardés) : le cache est reconstruit
+                self._conn.execute("DROP TABLE geocodes")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocodes ("
+                " key TEXT, reference TEXT, latitude REAL, longitude REAL, precision TEXT, updated TEXT,"
+                " PRIMARY KEY (key, reference))"
+            )
+
+    def lookup(self, keys, reference=""):
+        """Coordonnées déjà connues parmi ``keys`` pour la version ``reference`` (DataFrame indexé par clé).
+
+        Un résultat de la table de référence l'emporte sur les coordonnées reprises du registre.
+        """
+        keys = list(dict.fromkeys(keys))
+        frames = []
+        with self._lock:
+            for start in range(0, len(keys), 900):
+                batch = keys[start:start + 900]
+                placeholders = ",".join("?" * len(batch))
+                frames.append(pd.read_sql_query(
+                    "SELECT key, latitude, longitude, precision FROM geocodes"
+                    f" WHERE key IN ({placeholders}) AND reference IN ('', ?) AND latitude IS NOT NULL"
+                    " ORDER BY reference",
+                    self._conn, params=batch + [reference],
+                ))
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=["latitude", "longitude", "precision"])
+        known = pd.concat(frames).set_index("key")
+        return known[~known.index.duplicated(keep="last")]
+
+    def store(self, resolved, reference="", replace=True):
+        """Enregistre des coordonnées (DataFrame indexé par clé) pour la version ``reference``."""
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        rows = [
+            (key, reference, float(lat), float(lng), precision, now)
+            for key, lat, lng, precision in zip(
+                resolved.index, resolved["latitude"], resolved["longitude"], resolved["precision"]
+            )
+        ]
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock, self._conn:
+            self._conn.executemany(f"{verb} INTO geocodes VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def seed(self, df, keys=None):
+        """Ajoute au cache les coordonnées déjà présentes dans ``df`` (sans écraser l'existant)."""
+        keys = address_keys(df) if keys is None else keys
+        known = df[["latitude", "longitude"]].notna().all(axis=1).to_numpy()
+        seeded = pd.DataFrame(
+            {"latitude": df["latitude"].to_numpy()[known], "longitude": df["longitude"].to_numpy()[known]},
+            index=pd.Index(keys[known], name="key"),
+        )
+        seeded = seeded[~seeded.index.duplicated()]
+        seeded["precision"] = "source"
+        self.store(seeded, replace=False)
+        return len(seeded)
+
+    def close(self):
+        self._conn.close()
+
+
+def geocode(df, reference, cache, workers=None, refresh=False):
+    """Géocode ``df`` en ne résolvant que les adresses absentes du cache.
+
+    Retourne une copie de ``df`` avec ``latitude``/``longitude`` mises à jour
+    (les coordonnées existantes sont gardées si l'adresse reste introuvable)
+    et une colonne ``geocode_precision``, ainsi que des compteurs. Seules les
+    adresses trouvées sont ajoutées au cache.
+    """
+    keys = address_keys(df, workers)
+    unique_keys = pd.unique(keys)
+    if refresh:
+        cached = pd.DataFrame(columns=["latitude", "longitude", "precision"])
+    else:
+        cached = cache.lookup(unique_keys, reference.signature)
+    todo = [key for key in unique_keys if key not in cached.index]
+    resolved = reference.resolve(todo) if todo else cached.iloc[:0]
+    resolved = resolved[resolved["latitude"].notna()]
+    if len(resolved):
+        cache.store(resolved, reference.signature)
+
+    # Les tables vides sont écartées du concat (avertissement de pandas sur les entrées vides)
+    frames = [frame for frame in (cached, resolved) if len(frame)]
+    known = pd.concat(frames) if frames else cached
+    matched = known.reindex(keys)
+    result = df.copy()
+    found = matched["latitude"].notna().to_numpy()
+    for col in ["latitude", "longitude"]:
+        values = result[col].to_numpy(dtype=float, copy=True) if col in result.columns else np.full(len(result), np.nan)
+        values[found] = matched[col].to_numpy()[found]
+        result[col] = values
+    result["geocode_precision"] = matched["precision"].to_numpy()
+    stats = {
+        "rows": len(df),
+        "addresses": len(unique_keys),
+        "from_cache": len(unique_keys) - len(todo),
+        "geocoded": len(todo),
+        "not_found": int((~found).sum()),
+    }
+    return result, stats
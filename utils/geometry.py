@@ -0,0 +1,130 @@
+"""Géométries des cantons en TopoJSON simplifié, partagé par les couches des cartes.
+
+``data/cantons.geojson`` est une topologie TopoJSON (arcs partagés, coordonnées
+quantifiées). On la décode une seule fois, puis on simplifie chaque arc : un arc
+étant commun à deux cantons, la simplification reste cohérente de part et
+d'autre de la frontière (pas de trous ni de chevauchements). Chaque niveau est
+ré-encodé en TopoJSON compact (entiers en delta) et embarqué une seule fois
+dans la page, au lieu de deux ``gdf.to_json()`` pleine résolution.
+"""
+import copy
+import json
+import math
+
+import numpy as np
+import shapely
+
+from utils.data import CANTONS_GEOJSON, cached_resource, load_cantons
+
+OBJECT_NAME = "cantons"
+OBJECT_PATH = f"objects.{OBJECT_NAME}"
+
+# 📌 Niveaux de simplification (tolérance en degrés de latitude, ~111 km par degré)
+LEVELS = {
+    "full": 0.0,
+    "medium": 0.002,  # ~200 m : invisible aux zooms 8-9 utilisés par les pages
+    "coarse": 0.008,  # ~900 m : vue d'ensemble (zoom ≤ 7)
+}
+
+# Les longitudes sont comprimées par cos(latitude) à la latitude moyenne de la Suisse
+_LON_FACTOR = math.cos(math.radians(46.8))
+
+
+def level_for_zoom(zoom):
+    """Niveau de simplification adapté à un niveau de zoom Leaflet."""
+    if zoom is None or zoom >= 10:
+        return "full"
+    if zoom >= 8:
+        return "medium"
+    return "coarse"
+
+
+def _read_topology(path):
+    with open(path, encoding="utf-8") as f:
+        topology = json.load(f)
+    # On place l'identifiant dans les propriétés pour les tooltips et ``key_on``
+    for geometry in topology["objects"][OBJECT_NAME]["geometries"]:
+        geometry["properties"] = {"id": str(geometry["id"]), **geometry.get("properties", {})}
+    return topology
+
+
+def load_topology():
+    """Topologie pleine résolution, lue une fois par processus (lecture seule)."""
+    return cached_resource("topology", CANTONS_GEOJSON, _read_topology)
+
+
+def _decode_arc(arc):
+    """Arc delta-encodé → coordonnées entières absolues."""
+    return np.cumsum(np.asarray(arc, dtype=np.int64), axis=0)
+
+
+def _encode_arc(points):
+    """Coordonnées entières absolues → arc delta-encodé, sans points dupliqués."""
+    points = points[np.r_[True, np.any(np.diff(points, axis=0) != 0, axis=1)]]
+    if len(points) < 2:
+        points = np.vstack([points, points])
+    deltas = np.vstack([points[:1], np.diff(points, axis=0)])
+    return deltas.tolist()
+
+
+def _simplify_topology(topology, tolerance):
+    if not tolerance:
+        return topology
+    scale = np.asarray(topology["transform"]["scale"])
+    translate = np.asarray(topology["transform"]["translate"])
+    # Espace de travail à peu près isotrope : x en degrés × cos(lat), y en degrés
+    factor = scale * np.array([_LON_FACTOR, 1.0])
+
+    arcs = []
+    for arc in topology["arcs"]:
+        points = _decode_arc(arc)
+        closed = len(points) > 3 and np.array_equal(points[0], points[-1])
+        line = shapely.linestrings(points * factor)
+        simplified = np.asarray(shapely.get_coordinates(shapely.simplify(line, tolerance, preserve_topology=False)))
+        # Les anneaux fermés (enclaves, îles) doivent garder au moins 4 points
+        if closed and len(simplified) < 4:
+            simplified = points * factor
+        arcs.append(_encode_arc(np.rint(simplified / factor).astype(np.int64)))
+
+    simplified_topology = dict(topology, arcs=arcs)
+    simplified_topology["transform"] = {"scale": scale.tolist(), "translate": translate.tolist()}
+    return simplified_topology
+
+
+def simplified_topology(level="medium"):
+    """Topologie simplifiée pour un niveau de :data:`LEVELS`, calculée une fois par processus."""
+    return cached_resource(
+        f"topology:{level}", CANTONS_GEOJSON, lambda path: _simplify_topology(load_topology(), LEVELS[level])
+    )
+
+
+def _clean(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def cantons_topojson(level="medium", properties=None):
+    """TopoJSON des cantons prêt à être passé à Folium (``Choropleth(topojson=OBJECT_PATH)``).
+
+    ``properties`` associe à un identifiant de canton des valeurs à ajouter aux
+    propriétés (tooltip, style). Les arcs sont partagés avec le cache ; seules
+    les géométries sont copiées, car Folium y écrit le style calculé.
+    """
+    topology = simplified_topology(level)
+    geometries = copy.deepcopy(topology["objects"][OBJECT_NAME]["geometries"])
+    for geometry in geometries:
+        extra = (properties or {}).get(geometry["properties"]["id"], {})
+        geometry["properties"].update({k: _clean(v) for k, v in extra.items()})
+    objects = {OBJECT_NAME: dict(topology["objects"][OBJECT_NAME], geometries=geometries)}
+    return dict(topology, objects=objects)
+
+
+def cantons_geojson(level="coarse"):
+    """GeoJSON simplifié des cantons, pour les bibliothèques qui ne lisent pas le TopoJSON (Plotly)."""
+    def build(path):
+        gdf = load_cantons()[["id", "geometry"]]
+        gdf["geometry"] = gdf.geometry.simplify(LEVELS[level], preserve_topology=True)
+        return json.loads(gdf.to_json())
+
+    return cached_resource(f"geojson:{level}", CANTONS_GEOJSON, build)
@@ -0,0 +1,125 @@
+"""Cache des cartes Folium déjà construites.
+
+Les cartes ne dépendent que des fichiers de ``data/`` et de l'état des filtres :
+on les indexe donc par (signature des fichiers, page, filtres), plus la
+version du rendu : ``RENDER_VERSION`` et la version de Folium, pour qu'un HTML
+écrit sur disque par un ancien code ne soit jamais resservi. Le cache garde
+en mémoire les N dernières cartes utilisées (LRU) ; le HTML rendu est aussi
+écrit sur disque pour survivre à un redémarrage du serveur.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from utils.data import file_signature
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "maps"
+
+# 📌 À incrémenter à chaque changement des gabarits ou de la construction des cartes
+RENDER_VERSION = 1
+
+
+def artifact_key(page, datasets, **filters):
+    """Clé stable d'une carte : version du rendu, page, signature des fichiers sources et filtres."""
+    import folium
+
+    payload = {
+        "render": [RENDER_VERSION, folium.__version__],
+        "page": page,
+        "datasets": [file_signature(path) for path in datasets],
+        "filters": filters,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class MapCache:
+    """Cache LRU en mémoire, doublé d'un niveau disque pour le HTML rendu."""
+
+    def __init__(self, maxsize=256, directory=CACHE_DIR, max_files=2048):
+        self.maxsize = maxsize
+        self.directory = Path(directory) if directory else None
+        self.max_files = max_files
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        return None
+
+    def get_map(self, key, builder):
+        """Retourne la ``folium.Map`` en cache, ou la construit avec ``builder()``.
+
+        Les objets Folium ne sont pas sérialisables : ce niveau reste en mémoire.
+        """
+        key = ("map", key)
+        m = self._lookup(key)
+        if m is None:
+            m = builder()
+            self._remember(key, m)
+        return m
+
+    def get_html(self, key, builder):
+        """Retourne le HTML complet d'une carte (mémoire, puis disque, puis ``builder()``)."""
+        memory_key = ("html", key)
+        html = self._lookup(memory_key)
+        if html is not None:
+            return html
+
+        path = self.directory / f"{key}.html" if self.directory else None
+        if path is not None and path.exists():
+            html = path.read_text(encoding="utf-8")
+        else:
+            html = builder().get_root().render()
+            if path is not None:
+                self._write(path, html)
+        self._remember(memory_key, html)
+        return html
+
+    def _write(self, path, html):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Nom temporaire propre au thread : le préchauffage et les sessions peuvent écrire la même clé
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(html, encoding="utf-8")
+        tmp.replace(path)
+        # Éviction sur disque : on garde les fichiers les plus récents
+        files = []
+        for candidate in path.parent.glob("*.html"):
+            try:
+                files.append((candidate.stat().st_mtime, candidate))
+            except FileNotFoundError:
+                # Déjà évincé par un autre thread ou processus
+                continue
+        files.sort()
+        for _, old in files[: max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+        if disk and self.directory and self.directory.exists():
+            for path in self.directory.glob("*.html"):
+                path.unlink(missing_ok=True)
+
+
+# 📌 Cache partagé par toutes les sessions du processus
+map_cache = MapCache()
@@ -0,0 +1,200 @@
+"""Construction des couches Folium partagées par les pages."""
+import json
+from itertools import combinations
+
+import folium
+
+from utils.data import COMPANIES_CSV, load_companies
+from utils.map_cache import artifact_key, map_cache
+
+# 🟢 Définition des couleurs et tailles selon "Group"
+COLOR_MAP = {"Remettantes": "green", "Incinération": "red", "Regroupement": "blue"}
+SIZE_MAP = {"Remettantes": 2, "Incinération": 8, "Regroupement": 4}
+DEFAULT_COLOR = "gray"
+DEFAULT_SIZE = 5
+
+
+def group_styles():
+    """Style Leaflet de chaque groupe, appliqué côté navigateur."""
+    styles = {
+        group: {"radius": SIZE_MAP.get(group, DEFAULT_SIZE), "color": color, "fillColor": color}
+        for group, color in COLOR_MAP.items()
+    }
+    styles["default"] = {"radius": DEFAULT_SIZE, "color": DEFAULT_COLOR, "fillColor": DEFAULT_COLOR}
+    return styles
+
+
+def companies_feature_collection(df):
+    """Convertit les entreprises en FeatureCollection GeoJSON en une seule passe.
+
+    Seuls le groupe et le libellé du popup sont conservés dans les propriétés :
+    le style est résolu dans le navigateur à partir de ``Group``.
+    """
+    labels = df["Companies"].astype(str) + " - " + df["Cities"].astype(str) + " (" + df["Group"].astype(str) + ")"
+    coordinates = df[["longitude", "latitude"]].to_numpy().tolist()
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": coords},
+                "properties": {"Group": group, "label": label},
+            }
+            for coords, group, label in zip(coordinates, df["Group"].tolist(), labels.tolist())
+        ],
+    }
+
+
+def add_companies_layer(m, df, name="Entreprises"):
+    """Ajoute les entreprises à la carte sous forme d'une seule couche GeoJSON.
+
+    Remplace la création d'un ``folium.CircleMarker`` par ligne : le HTML
+    contient un tableau de points et une table de styles par groupe.
+    """
+    on_each_feature = folium.JsCode(
+        """
+        function(feature, layer) {
+            const styles = %s;
+            layer.setStyle(styles[feature.properties.Group] || styles["default"]);
+            layer.bindPopup(document.createTextNode(feature.properties.label));
+        }
+        """ % json.dumps(group_styles(), ensure_ascii=False)
+    )
+    return folium.GeoJson(
+        companies_feature_collection(df),
+        name=name,
+        marker=folium.CircleMarker(fill=True, fill_opacity=0.6),
+        on_each_feature=on_each_feature,
+    ).add_to(m)
+
+
+def add_clusters_layer(parent, clusters, name="Entreprises"):
+    """Ajoute les groupes d'entreprises renvoyés par ``PointIndex.query``.
+
+    Un groupe est dessiné comme un cercle dont la taille croît avec l'effectif,
+    dans la couleur du type d'entreprise majoritaire ; un point isolé garde le
+    style de son groupe et son popup.
+    """
+    collection = companies_feature_collection(clusters.assign(Companies="", Cities=""))
+    for feature, count, label in zip(collection["features"], clusters["count"].tolist(), clusters["label"].tolist()):
+        feature["properties"].update(count=count, label=label)
+    on_each_feature = folium.JsCode(
+        """
+        function(feature, layer) {
+            const styles = %s;
+            const style = Object.assign({}, styles[feature.properties.Group] || styles["default"]);
+            if (feature.properties.count > 1) {
+                style.radius = 8 + 4 * Math.log10(feature.properties.count);
+                layer.bindTooltip(feature.properties.label);
+            } else {
+                layer.bindPopup(document.createTextNode(feature.properties.label));
+            }
+            layer.setStyle(style);
+        }
+        """ % json.dumps(group_styles(), ensure_ascii=False)
+    )
+    return folium.GeoJson(
+        collection,
+        name=name,
+        marker=folium.CircleMarker(fill=True, fill_opacity=0.6),
+        on_each_feature=on_each_feature,
+    ).add_to(parent)
+
+
+def add_catchments_layer(parent, catchments, name="Zones de desserte"):
+    """Ajoute les installations avec le potentiel cumulé de leur zone de desserte.
+
+    ``catchments`` vient de ``utils.proximity.catchments`` : la surface du
+    cercle est proportionnelle au potentiel des remettants rattachés. Sans
+    quantités déclarées par entreprise, le potentiel est marqué comme estimé.
+    """
+    from utils.allocation import quantities_declared
+
+    unit = " GWh, " if quantities_declared() else " GWh (estimation), "
+    labels = (
+        catchments["Companies"].astype(str) + " (" + catchments["Group"].astype(str) + ") : "
+        + catchments["Remettantes"].astype(str) + " remettants, "
+        + catchments["Pot_Ener [GWh]"].map("{:.1f}".format) + unit
+        + catchments["Distance_moy [km]"].map(lambda d: "n.d." if d != d else f"{d:.1f}") + " km en moyenne"
+    )
+    collection = companies_feature_collection(catchments.assign(Companies="", Cities=""))
+    for feature, potential, label in zip(collection["features"], catchments["Pot_Ener [GWh]"].tolist(), labels.tolist()):
+        feature["properties"].update(potential=potential, label=label)
+    on_each_feature = folium.JsCode(
+        """
+        function(feature, layer) {
+            const styles = %s;
+            const style = Object.assign({}, styles[feature.properties.Group] || styles["default"]);
+            style.radius = 5 + 1.5 * Math.sqrt(feature.properties.potential);
+            style.fillOpacity = 0.25;
+            style.weight = 2;
+            layer.setStyle(style);
+            layer.bindTooltip(document.createTextNode(feature.properties.label));
+        }
+        """ % json.dumps(group_styles(), ensure_ascii=False)
+    )
+    return folium.GeoJson(
+        collection,
+        name=name,
+        marker=folium.CircleMarker(fill=True),
+        on_each_feature=on_each_feature,
+    ).add_to(parent)
+
+
+def filter_companies(df, canton="Tous", groups=None):
+    """Applique les filtres de la page 1 (canton et types d'entreprise)."""
+    filtered_df = df if groups is None else df[df["Group"].isin(groups)]
+    if canton != "Tous":
+        filtered_df = filtered_df[filtered_df["Cantons"] == canton]
+    return filtered_df
+
+
+def build_base_map():
+    """Fond de carte clair centré sur la Suisse, sans couche de données."""
+    return folium.Map(
+        location=[46.8182, 8.2275],
+        zoom_start=8,
+        tiles="CartoDB positron",
+        attr='© OpenStreetMap contributors, © CartoDB'
+    )
+
+
+def build_companies_map(df, catchments=None):
+    """Carte des entreprises avec un fond clair (et les zones de desserte si fournies)."""
+    m = build_base_map()
+    add_companies_layer(m, df)
+    if catchments is not None:
+        add_catchments_layer(m, catchments)
+        folium.LayerControl(collapsed=False).add_to(m)
+    return m
+
+
+def filtered_catchments(canton="Tous"):
+    """Zones de desserte des installations du canton sélectionné (toutes pour « Tous »)."""
+    from utils.proximity import catchments
+
+    return filter_companies(catchments(), canton)
+
+
+def companies_map_html(canton="Tous", groups=None, show_catchments=False):
+    """HTML de la carte des entreprises pour un état de filtres, via le cache de cartes."""
+    groups = sorted(groups) if groups is not None else None
+    if show_catchments:
+        from utils.allocation import quantity_sources
+
+        key = artifact_key("entreprises", quantity_sources(), canton=canton, groups=groups, catchments=True)
+        return map_cache.get_html(key, lambda: build_companies_map(
+            filter_companies(load_companies(), canton, groups), filtered_catchments(canton)
+        ))
+    key = artifact_key("entreprises", [COMPANIES_CSV], canton=canton, groups=groups)
+    return map_cache.get_html(key, lambda: build_companies_map(filter_companies(load_companies(), canton, groups)))
+
+
+def prewarm_companies_maps():
+    """Construit à l'avance les cartes de tous les cantons × combinaisons de groupes."""
+    df = load_companies()
+    all_groups = sorted(df["Group"].unique())
+    group_sets = [list(c) for n in range(len(all_groups) + 1) for c in combinations(all_groups, n)]
+    for canton in ["Tous"] + sorted(df["Cantons"].unique()):
+        for groups in group_sets:
+            companies_map_html(canton, groups)
@@ -0,0 +1,301 @@
+"""Instrumentation des reruns : durée et mémoire de chaque étape d'une page.
+
+Chaque page ouvre un ``Profiler`` et enveloppe ses étapes coûteuses
+(chargement, fusion, construction de la carte, rendu, résolution du clic).
+À la fin du rerun, les mesures sont :
+
+- agrégées en mémoire (histogrammes par page et par étape) et écrites au plus
+  toutes les ``METRICS_INTERVAL_S`` secondes dans un fichier texte Prometheus
+  par processus (``.cache/profile/metrics.<pid>.prom``, série étiquetée
+  ``pid``), lisible par le « textfile collector » de node_exporter ;
+- si le profilage est activé (interrupteur « ⏱️ Profilage » ou ``?profile=1``
+  dans l'URL), affichées dans la barre latérale et ajoutées à un journal JSON
+  Lines tournant (``.cache/profile/reruns.jsonl``).
+
+Sans profilage, un rerun n'écrit donc sur disque que le fichier de métriques,
+au plus une fois toutes les ``METRICS_INTERVAL_S`` secondes par processus.
+
+La mémoire est lue dans ``/proc/self/statm`` (RSS courant) : la mesure ne
+coûte presque rien et reste active sur chaque rerun. Sans ``/proc`` (macOS),
+on se rabat sur le pic de RSS (``ru_maxrss``), qui ne redescend jamais.
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROFILE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "profile"
+LOG_FILE = "reruns.jsonl"
+METRICS_GLOB = "metrics.*.prom"
+METRICS_INTERVAL_S = 15.0
+MAX_LOG_BYTES = 5 * 1024 * 1024  # au-delà, le journal passe en ``.1`` (une seule archive)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 📌 Étapes instrumentées et libellés du panneau
+STAGE_LABELS = {
+    "load": "Chargement des données",
+    "merge": "Fusion / filtres",
+    "map_build": "Construction de la carte",
+    "render": "Rendu (st_folium / iframe)",
+    "click": "Résolution du clic",
+    "allocation": "Répartition des flux",
+    "rollup": "Agrégat par niveau administratif",
+}
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes():
+    """Mémoire résidente actuelle du processus.
+
+    Sans ``/proc``, c'est le pic de mémoire résidente (``ru_maxrss``, en octets
+    sur macOS et en kio ailleurs) ; sans module ``resource`` (Windows), 0.
+    """
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+_payload_sizes = weakref.WeakKeyDictionary()
+
+
+def payload_bytes(content):
+    """Taille du HTML envoyé au navigateur (une carte Folium n'est rendue qu'une fois)."""
+    if isinstance(content, str):
+        return len(content.encode("utf-8"))
+    size = _payload_sizes.get(content)
+    if size is None:
+        size = len(content.get_root().render().encode("utf-8"))
+        _payload_sizes[content] = size
+    return size
+
+
+class Metrics:
+    """Histogrammes Prometheus des durées, agrégés par processus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._gauges = {}
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            counts, total, count = self._histograms.get(key, ([0] * len(BUCKETS), 0.0, 0))
+            counts = [c + (value <= bound) for c, bound in zip(counts, BUCKETS)]
+            self._histograms[key] = (counts, total + value, count + 1)
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def render(self, **const_labels):
+        """Texte au format d'exposition Prometheus (``const_labels`` ajoutées à chaque série)."""
+        def fmt(labels, **extra):
+            items = list(labels) + list(const_labels.items()) + list(extra.items())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}" if items else ""
+
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            gauges = sorted(self._gauges.items())
+        seen = set()
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, c in zip(BUCKETS, counts):
+                lines.append(f"{name}_bucket{fmt(labels, le=bound)} {c}")
+            lines.append(f'{name}_bucket{fmt(labels, le="+Inf")} {count}')
+            lines.append(f"{name}_sum{fmt(labels)} {total:.6f}")
+            lines.append(f"{name}_count{fmt(labels)} {count}")
+        for (name, labels), value in gauges:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# 📌 Agrégats partagés par toutes les sessions du processus
+metrics = Metrics()
+_write_lock = threading.Lock()
+_last_metrics_write = None
+
+
+def metrics_file(directory=PROFILE_DIR, pid=None):
+    """Fichier Prometheus du processus ``pid`` (processus courant par défaut)."""
+    return directory / f"metrics.{os.getpid() if pid is None else pid}.prom"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_stale_metrics(directory):
+    """Supprime les fichiers Prometheus des processus arrêtés (séries qui ne bougent plus)."""
+    for path in directory.glob(METRICS_GLOB):
+        pid = path.name.split(".")[1]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            path.unlink(missing_ok=True)
+
+
+def _write_log(record, directory=PROFILE_DIR):
+    """Ajoute le rerun au journal tournant."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with _write_lock:
+        log = directory / LOG_FILE
+        if log.exists() and log.stat().st_size > MAX_LOG_BYTES:
+            log.replace(log.with_name(LOG_FILE + ".1"))
+        with log.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _write_metrics(directory=PROFILE_DIR):
+    """Réécrit le fichier Prometheus du processus, au plus toutes les ``METRICS_INTERVAL_S`` secondes."""
+    global _last_metrics_write
+    now = time.monotonic()
+    with _write_lock:
+        if _last_metrics_write is not None and now - _last_metrics_write < METRICS_INTERVAL_S:
+            return
+        first = _last_metrics_write is None
+        _last_metrics_write = now
+    directory.mkdir(parents=True, exist_ok=True)
+    if first:
+        _remove_stale_metrics(directory)
+    target = metrics_file(directory)
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_text(metrics.render(pid=os.getpid()), encoding="utf-8")
+    tmp.replace(target)
+
+
+def _export(record, log=False, directory=PROFILE_DIR):
+    """Écrit le fichier Prometheus (limité dans le temps) et, si ``log``, ajoute le rerun au journal."""
+    try:
+        if log:
+            _write_log(record, directory)
+        _write_metrics(directory)
+    except OSError:
+        # Le profilage ne doit jamais faire échouer une page (disque plein, lecture seule…)
+        pass
+
+
+class Profiler:
+    """Mesures d'un rerun de page, étape par étape."""
+
+    def __init__(self, page):
+        self.page = page
+        self.stages = []
+        self.payload = None
+        self._start = time.perf_counter()
+        self._rss_start = rss_bytes()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Chronomètre le bloc et note la variation de mémoire résidente."""
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            rss_after = rss_bytes()
+            self.stages.append({
+                "stage": name,
+                "seconds": time.perf_counter() - start,
+                "rss_delta": rss_after - rss_before,
+                "rss": rss_after,
+            })
+
+    def set_payload(self, content):
+        """Note la taille du HTML de la carte.
+
+        Un HTML déjà rendu (``str``) est toujours mesuré ; une ``folium.Map``
+        n'est rendue pour la mesure que si le panneau est affiché.
+        """
+        if isinstance(content, str) or profiling_enabled():
+            self.payload = payload_bytes(content)
+
+    def record(self):
+        """Mesures du rerun (durées par étape cumulées, mémoire, taille du HTML)."""
+        rss = rss_bytes()
+        return {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "page": self.page,
+            "total_seconds": time.perf_counter() - self._start,
+            "stages": self.stages,
+            "rss": rss,
+            "rss_delta": rss - self._rss_start,
+            "payload_bytes": self.payload,
+        }
+
+    def finish(self):
+        """Agrège les mesures du rerun ; journal et panneau seulement si le profilage est activé."""
+        record = self.record()
+        labels = {"page": self.page}
+        for entry in self.stages:
+            metrics.observe("mapght_stage_seconds", {**labels, "stage": entry["stage"]}, entry["seconds"])
+        metrics.observe("mapght_rerun_seconds", labels, record["total_seconds"])
+        metrics.set("mapght_rss_bytes", {}, record["rss"])
+        if record["payload_bytes"] is not None:
+            metrics.set("mapght_payload_bytes", labels, record["payload_bytes"])
+        enabled = profiling_enabled()
+        _export(record, log=enabled)
+        if enabled:
+            show_panel(record)
+        return record
+
+
+def profiling_enabled():
+    """Profilage demandé par l'interrupteur de la barre latérale (activé d'office par ``?profile=1``)."""
+    import streamlit as st
+
+    return bool(st.session_state.get("profile"))
+
+
+def page_profiler(page):
+    """``Profiler`` du rerun de ``page``, avec l'interrupteur du panneau dans la barre latérale."""
+    import streamlit as st
+
+    st.sidebar.toggle("⏱️ Profilage", value=st.query_params.get("profile") == "1", key="profile")
+    return Profiler(page)
+
+
+def show_panel(record):
+    """Panneau de la barre latérale : durée et mémoire de chaque étape du rerun."""
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Profil du rerun", expanded=True):
+        rows = pd.DataFrame(record["stages"], columns=["stage", "seconds", "rss_delta", "rss"])
+        table = pd.DataFrame({
+            "Étape": rows["stage"].map(lambda s: STAGE_LABELS.get(s, s)),
+            "Durée [ms]": rows["seconds"] * 1000,
+            "Δ mémoire [Mo]": rows["rss_delta"] / 2**20,
+        })
+        st.dataframe(table, hide_index=True, column_config={
+            "Durée [ms]": st.column_config.NumberColumn(format="%.1f"),
+            "Δ mémoire [Mo]": st.column_config.NumberColumn(format="%.1f"),
+        })
+        st.markdown(f"**Rerun : {record['total_seconds'] * 1000:.0f} ms**")
+        st.markdown(f"Mémoire résidente : {record['rss'] / 2**20:.0f} Mo")
+        if record["payload_bytes"] is not None:
+            st.markdown(f"HTML de la carte : {record['payload_bytes'] / 1024:.0f} Ko")
@@ -0,0 +1,132 @@
+"""Plus proches installations et zones de desserte.
+
+Les entreprises sont indexées dans un KD-tree (SciPy) sur leurs coordonnées
+projetées sur la sphère unité : la distance euclidienne entre deux points
+(corde) est une fonction croissante de la distance haversine, les requêtes
+k plus proches voisins et par rayon sont donc exactes et en O(log n) par point
+au lieu de comparer toutes les paires.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregation import TOTAL_COLUMN, compute_potentials
+from utils.allocation import FACILITY_GROUPS, SOURCE_GROUP, quantity_sources, source_quantities
+from utils.data import COMPANIES_CSV, file_signature, load_companies
+from utils.spatial import EARTH_RADIUS_KM
+
+
+def unit_vectors(lats, lngs):
+    """Coordonnées cartésiennes ``(n, 3)`` sur la sphère unité."""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lng = np.radians(np.asarray(lngs, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)])
+
+
+def km_to_chord(distance_km):
+    return 2 * np.sin(np.asarray(distance_km, dtype=float) / (2 * EARTH_RADIUS_KM))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord, dtype=float) / 2, 0.0, 1.0))
+
+
+class CompanyTree:
+    """KD-tree des entreprises pour les requêtes de proximité groupées."""
+
+    def __init__(self, df):
+        from scipy.spatial import cKDTree
+
+        self.df = df.reset_index(drop=True)
+        self.tree = cKDTree(unit_vectors(self.df["latitude"], self.df["longitude"]))
+
+    def __len__(self):
+        return len(self.df)
+
+    def nearest(self, lats, lngs, k=1):
+        """Distances (km) et positions des ``k`` entreprises les plus proches, formes ``(n, k)``."""
+        k = min(k, len(self))
+        chords, indices = self.tree.query(unit_vectors(lats, lngs), k=k)
+        return chord_to_km(chords).reshape(-1, k), np.asarray(indices).reshape(-1, k)
+
+    def within(self, lats, lngs, radius_km):
+        """Positions des entreprises à moins de ``radius_km`` de chaque point (une liste par point)."""
+        return self.tree.query_ball_point(unit_vectors(lats, lngs), km_to_chord(radius_km), return_sorted=True)
+
+    def count_within(self, lats, lngs, radius_km):
+        """Nombre d'entreprises à moins de ``radius_km`` de chaque point."""
+        return np.asarray(
+            self.tree.query_ball_point(unit_vectors(lats, lngs), km_to_chord(radius_km), return_length=True)
+        )
+
+
+@lru_cache(maxsize=16)
+def _cached_tree(signature, groups):
+    df = load_companies()
+    if groups is not None:
+        df = df[df["Group"].isin(groups)]
+    return CompanyTree(df)
+
+
+def get_company_tree(groups=None):
+    """Index des entreprises des groupes ``groups`` (toutes si ``None``), une fois par processus."""
+    groups = tuple(sorted(groups)) if groups is not None else None
+    return _cached_tree(file_signature(COMPANIES_CSV), groups)
+
+
+def nearest_facilities(k=1, groups=FACILITY_GROUPS):
+    """Les ``k`` installations les plus proches de chaque remettant (une ligne par couple)."""
+    companies = load_companies()
+    sources = companies[companies["Group"] == SOURCE_GROUP].reset_index(drop=True)
+    tree = get_company_tree(groups)
+    distances, indices = tree.nearest(sources["latitude"], sources["longitude"], k)
+    facilities = tree.df.iloc[indices.ravel()].reset_index(drop=True)
+    return pd.DataFrame({
+        "OMoD": np.repeat(sources["OMoD"].to_numpy(), distances.shape[1]),
+        "Companies": np.repeat(sources["Companies"].to_numpy(), distances.shape[1]),
+        "Cantons": np.repeat(sources["Cantons"].astype(str).to_numpy(), distances.shape[1]),
+        "Rank": np.tile(np.arange(1, distances.shape[1] + 1), len(sources)),
+        "Facility_OMoD": facilities["OMoD"],
+        "Facility": facilities["Companies"],
+        "Facility_Group": facilities["Group"],
+        "Distance [km]": distances.ravel(),
+    })
+
+
+def catchments(groups=FACILITY_GROUPS):
+    """Zone de desserte de chaque installation : remettants dont elle est la plus proche.
+
+    Pour chaque installation : nombre de remettants rattachés, potentiel
+    énergétique cumulé (GWh) et distances moyenne et maximale (km). Sans
+    quantités déclarées par entreprise, le potentiel est une estimation
+    (voir ``utils.allocation.source_quantities``).
+    """
+    groups = tuple(sorted(groups))
+    signatures = tuple(file_signature(path) for path in quantity_sources())
+    return _cached_catchments(signatures, groups).copy(deep=False)
+
+
+@lru_cache(maxsize=8)
+def _cached_catchments(signatures, groups):
+    sources = compute_potentials(source_quantities()).reset_index(drop=True)
+    tree = get_company_tree(groups)
+    distances, indices = tree.nearest(sources["latitude"], sources["longitude"], 1)
+    assigned = pd.DataFrame({
+        "facility": indices[:, 0],
+        "distance": distances[:, 0],
+        "potential": sources[TOTAL_COLUMN].to_numpy(),
+    })
+    stats = assigned.groupby("facility").agg(
+        Remettantes=("distance", "size"),
+        potential=("potential", "sum"),
+        mean_distance=("distance", "mean"),
+        max_distance=("distance", "max"),
+    )
+    result = tree.df[["OMoD", "Companies", "Cities", "Cantons", "Group", "latitude", "longitude"]].copy()
+    stats = stats.reindex(np.arange(len(result)))
+    result["Remettantes"] = stats["Remettantes"].fillna(0).astype(int).to_numpy()
+    result[TOTAL_COLUMN] = stats["potential"].fillna(0).to_numpy()
+    result["Distance_moy [km]"] = stats["mean_distance"].to_numpy()
+    result["Distance_max [km]"] = stats["max_distance"].to_numpy()
+    return result
@@ -0,0 +1,106 @@
+"""Livrables par canton : carte, graphiques, résumé et liste des entreprises.
+
+Reprend la logique des pages (carte énergétique unifiée, résumés précalculés,
+filtres de la page 1) sans Streamlit. Chaque canton est indépendant : le
+rendu se parallélise sur un pool de processus, et un canton dont les sources
+n'ont pas changé depuis le dernier export n'est pas régénéré.
+"""
+import json
+import math
+import os
+from pathlib import Path
+
+from utils.data import CANTONS_GEOJSON, COMPANIES_CSV, load_cantons, load_companies
+from utils.energy_map import build_energy_map, layer_sources
+from utils.map_cache import artifact_key, map_cache
+from utils.maps import add_companies_layer, filter_companies
+from utils.summary import get_balance_summaries, get_potential_summaries, summary_figure
+
+PLOTLY_JS = "plotly.min.js"
+KEY_FILE = ".export-key"
+# 📌 Niveau de simplification des géométries pour des cartes zoomées sur un canton
+MAP_GEOMETRY_LEVEL = "full"
+
+
+def report_sources():
+    """Fichiers dont dépendent les livrables."""
+    return [COMPANIES_CSV, CANTONS_GEOJSON] + layer_sources()
+
+
+def canton_map_html(canton):
+    """Carte énergétique centrée sur le canton, avec ses entreprises (via le cache de cartes)."""
+    def build():
+        m = build_energy_map(MAP_GEOMETRY_LEVEL)
+        add_companies_layer(m, filter_companies(load_companies(), canton))
+        min_lng, min_lat, max_lng, max_lat = load_cantons().set_index("id").loc[[canton]].total_bounds
+        m.fit_bounds([[min_lat, min_lng], [max_lat, max_lng]])
+        return m
+
+    key = artifact_key("rapport_carte", report_sources(), canton=canton, geometry_level=MAP_GEOMETRY_LEVEL)
+    return map_cache.get_html(key, build)
+
+
+def canton_summary(canton):
+    """Résumé JSON du canton : potentiels par flux, balance et classe."""
+    total = get_potential_summaries("total").get(canton)
+    residuel = get_potential_summaries("residuel").get(canton)
+    balance = get_balance_summaries().get(canton)
+    companies = filter_companies(load_companies(), canton)
+    return {
+        "canton": canton,
+        "potentiel_total": None if total is None else {"flux": total["flows"], "total": total["total"]},
+        "potentiel_residuel": None if residuel is None else {"flux": residuel["flows"], "total": residuel["total"]},
+        "balance": None if balance is None or math.isnan(balance["balance"]) else balance["balance"],
+        "classe": None if balance is None else balance["classe"],
+        "entreprises": {str(group): int(count) for group, count in companies["Group"].value_counts().items()},
+    }
+
+
+def _write_text(path, text):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+
+
+def write_shared(output_dir):
+    """Fichiers communs à tous les cantons (Plotly.js, écrit une seule fois)."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    plotly_js = output_dir / PLOTLY_JS
+    if not plotly_js.exists():
+        from plotly.offline import get_plotlyjs
+
+        _write_text(plotly_js, get_plotlyjs())
+
+
+def export_canton(canton, output_dir, png=False, force=False):
+    """Écrit les livrables d'un canton dans ``output_dir/<canton>/``.
+
+    Retourne ``(canton, statut)`` avec le statut ``"ok"`` ou ``"inchangé"``
+    (sources et options identiques au dernier export, rien n'est réécrit).
+    """
+    import plotly.io as pio
+
+    folder = Path(output_dir) / canton
+    key = artifact_key("rapport", report_sources(), canton=canton, png=png)
+    key_file = folder / KEY_FILE
+    if not force and key_file.exists() and key_file.read_text(encoding="utf-8") == key:
+        return canton, "inchangé"
+
+    folder.mkdir(parents=True, exist_ok=True)
+    _write_text(folder / "carte.html", canton_map_html(canton))
+
+    for dataset in ("total", "residuel"):
+        summary = get_potential_summaries(dataset).get(canton)
+        if summary is None:
+            continue
+        fig = pio.from_json(json.dumps(summary_figure(summary)))
+        _write_text(folder / f"potentiel_{dataset}.html", pio.to_html(fig, include_plotlyjs=f"../{PLOTLY_JS}"))
+        if png:
+            # Nécessite le paquet optionnel ``kaleido``
+            fig.write_image(folder / f"potentiel_{dataset}.png")
+
+    _write_text(folder / "resume.json", json.dumps(canton_summary(canton), ensure_ascii=False, indent=2))
+    _write_text(folder / "entreprises.csv", filter_companies(load_companies(), canton).to_csv(index=False))
+    _write_text(key_file, key)
+    return canton, "ok"
@@ -0,0 +1,177 @@
+"""Moteur de scénarios : potentiels et balances pour un PCI cible choisi.
+
+Les fichiers fournis sont calculés pour un mélange à 18 MJ/kg et les PCI de
+référence de chaque flux. Ici on les recalcule depuis les quantités par canton
+(``Quantities_XX [Kg]``) pour n'importe quel PCI cible et n'importe quels PCI
+de flux. Le calcul est un seul produit de tableaux ``(scénarios, cantons,
+flux)`` : balayer des centaines de PCI cibles prend quelques millisecondes.
+Chaque jeu de paramètres est gardé en cache tant que les fichiers ne changent
+pas.
+
+Modèle du mélange : les flux de ``BLEND_FLOWS`` sous le PCI cible (eaux
+solvantées) sont compensés par ceux au-dessus (solvants usagés). La balance
+vaut ``Σ (PCI_flux - PCI_cible) × quantité``. Le côté excédentaire n'est
+absorbé qu'en proportion du côté déficitaire : ce qui n'entre pas dans le
+mélange, plus les flux hors mélange, forme le potentiel résiduel.
+
+Aux paramètres de référence, le modèle reproduit le potentiel total et la
+balance de chaque canton, sauf GL (le fichier correspond à un PCI du flux 01
+de 6,073 MJ/kg au lieu de 5,073). Le potentiel résiduel fourni n'est pas
+reproductible depuis les quantités : certains cantons n'y gardent aucun
+solvant usagé malgré une balance excédentaire, d'autres en gardent malgré une
+balance déficitaire. Aux paramètres de référence, les pages, l'API et les
+rapports lisent donc les fichiers fournis ; le modèle ne sert que lorsqu'un
+paramètre change, et son résultat est alors présenté comme un scénario.
+``reference_gaps`` liste les écarts du modèle avec les fichiers fournis.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregation import FLOWS, MJ_PER_GWH, PCI_MJ_KG, POTENTIAL_COLUMNS, QUANTITY_COLUMNS, TOTAL_COLUMN
+from utils.data import BALANCE_CSV, POTENTIEL_RES_CSV, dataset_path, file_signature, load_dataset
+
+# 📌 Paramètres de référence des fichiers fournis
+TARGET_PCI = 18.0
+BLEND_FLOWS = ["01", "04"]
+
+BALANCE_MJ_COLUMN = "Balance_Ener [MJ]"
+BALANCE_COLUMN = "Balance_Ener [GWh]"
+
+# 📌 Écart (GWh) au-delà duquel le modèle et un fichier fourni sont signalés comme différents
+GAP_TOLERANCE_GWH = 0.01
+
+
+def _pci_vector(pci=None):
+    pci = {**PCI_MJ_KG, **(pci or {})}
+    return np.array([float(pci[flow]) for flow in FLOWS])
+
+
+def evaluate(quantities, pci, targets, blend=None):
+    """Balance (GWh) et potentiels résiduels (GWh) pour chaque PCI cible.
+
+    ``quantities`` est un tableau ``(cantons, flux)`` en kg, ``pci`` un vecteur
+    ``(flux,)`` en MJ/kg et ``targets`` un vecteur ``(scénarios,)``. Retourne
+    ``balance`` de forme ``(scénarios, cantons)`` et ``residual`` de forme
+    ``(scénarios, cantons, flux)``.
+    """
+    quantities = np.asarray(quantities, dtype=float)
+    pci = np.asarray(pci, dtype=float)
+    targets = np.atleast_1d(np.asarray(targets, dtype=float))
+    blend = np.isin(FLOWS, BLEND_FLOWS if blend is None else blend)
+
+    # Écart énergétique de chaque flux du mélange au PCI cible (MJ)
+    delta = (pci[None, :] - targets[:, None]) * blend[None, :]
+    contributions = quantities[None, :, :] * delta[:, None, :]
+    surplus = np.clip(contributions, 0, None).sum(axis=2)
+    deficit = np.clip(-contributions, 0, None).sum(axis=2)
+
+    # Part absorbée de chaque côté : le plus petit des deux côtés l'est entièrement
+    with np.errstate(divide="ignore", invalid="ignore"):
+        used_surplus = np.where(surplus > 0, np.minimum(1.0, deficit / surplus), 0.0)
+        used_deficit = np.where(deficit > 0, np.minimum(1.0, surplus / deficit), 0.0)
+    absorbed = np.where(
+        contributions > 0, used_surplus[:, :, None],
+        np.where(contributions < 0, used_deficit[:, :, None], (delta == 0)[:, None, :] * blend[None, None, :])
+    )
+
+    balance = (surplus - deficit) / MJ_PER_GWH
+    residual = quantities[None, :, :] * (1.0 - absorbed) * pci[None, None, :] / MJ_PER_GWH
+    return balance, residual
+
+
+def _scenario_frames(quantities_df, incineration, target_pci, pci):
+    quantities = quantities_df[QUANTITY_COLUMNS].to_numpy(dtype=float)
+    pci_vector = _pci_vector(pci)
+    balance, residual = evaluate(quantities, pci_vector, [target_pci])
+
+    base = quantities_df[["Cantons"] + QUANTITY_COLUMNS].reset_index(drop=True)
+    total = base.copy()
+    total[POTENTIAL_COLUMNS] = quantities * pci_vector / MJ_PER_GWH
+    total[TOTAL_COLUMN] = total[POTENTIAL_COLUMNS].sum(axis=1)
+
+    residuel = base.copy()
+    residuel[POTENTIAL_COLUMNS] = residual[0]
+    residuel[TOTAL_COLUMN] = residual[0].sum(axis=1)
+
+    # Comme le fichier de référence : balance seulement pour les cantons avec incinération
+    balances = pd.DataFrame({"Cantons": base["Cantons"], BALANCE_COLUMN: balance[0]})
+    balances = balances[balances["Cantons"].isin(incineration)].reset_index(drop=True)
+    balances.insert(1, BALANCE_MJ_COLUMN, balances[BALANCE_COLUMN] * MJ_PER_GWH)
+    return {"total": total, "residuel": residuel, "balance": balances}
+
+
+def scenario_key(target_pci=TARGET_PCI, pci=None):
+    """Paramètres normalisés d'un scénario (clé de cache)."""
+    pci = {**PCI_MJ_KG, **(pci or {})}
+    return round(float(target_pci), 6), tuple((flow, round(float(pci[flow]), 6)) for flow in FLOWS)
+
+
+def is_reference(target_pci=TARGET_PCI, pci=None):
+    """Vrai si les paramètres sont ceux des fichiers fournis."""
+    return scenario_key(target_pci, pci) == scenario_key()
+
+
+def scenario_sources(year=None):
+    """Fichiers dont dépend un scénario : quantités par canton et liste des cantons avec incinération."""
+    balance = dataset_path("balance", year)
+    return [dataset_path("total", year), balance if balance.exists() else BALANCE_CSV]
+
+
+@lru_cache(maxsize=256)
+def _cached_scenario(signatures, target_pci, pci, year):
+    # Sans partition de balance pour l'année, on garde la liste actuelle des cantons avec incinération
+    balance = load_dataset("balance", year if dataset_path("balance", year).exists() else None)
+    return _scenario_frames(load_dataset("total", year), set(balance["Cantons"]), target_pci, dict(pci))
+
+
+def run_scenario(target_pci=TARGET_PCI, pci=None, year=None):
+    """Tables ``total``, ``residuel`` et ``balance`` (mêmes colonnes que les CSV) d'un scénario.
+
+    Avec ``year``, le scénario part des quantités de la partition annuelle.
+    Le résultat est mis en cache par jeu de paramètres ; les tables sont
+    partagées, on en renvoie des copies superficielles.
+    """
+    signatures = tuple(file_signature(path) for path in scenario_sources(year))
+    frames = _cached_scenario(signatures, *scenario_key(target_pci, pci), year)
+    return {name: frame.copy(deep=False) for name, frame in frames.items()}
+
+
+@lru_cache(maxsize=4)
+def _cached_gaps(signatures, tolerance):
+    model = run_scenario()
+    columns = {"total": TOTAL_COLUMN, "residuel": TOTAL_COLUMN, "balance": BALANCE_COLUMN}
+    frames = []
+    for key, column in columns.items():
+        shipped = load_dataset(key)[["Cantons", column]].rename(columns={column: "fichier"})
+        computed = model[key][["Cantons", column]].rename(columns={column: "modele"})
+        gaps = shipped.merge(computed, on="Cantons", how="outer")
+        gaps["ecart"] = gaps["modele"] - gaps["fichier"]
+        frames.append(gaps[~(gaps["ecart"].abs() <= tolerance)].assign(indicateur=key))
+    return pd.concat(frames, ignore_index=True)[["Cantons", "indicateur", "fichier", "modele", "ecart"]]
+
+
+def reference_gaps(tolerance=GAP_TOLERANCE_GWH):
+    """Cantons dont le modèle (paramètres de référence) s'écarte des fichiers fournis.
+
+    Une ligne par canton et indicateur (``total``, ``residuel`` ou ``balance``) : valeur du
+    fichier, valeur du modèle et écart (GWh). Un canton présent d'un seul côté
+    apparaît avec une valeur manquante.
+    """
+    sources = scenario_sources() + [POTENTIEL_RES_CSV]
+    return _cached_gaps(tuple(file_signature(path) for path in sources), tolerance).copy(deep=False)
+
+
+def sweep(targets, pci=None):
+    """Balance et potentiel résiduel de chaque canton pour une série de PCI cibles (format long)."""
+    df = load_dataset("total")
+    targets = np.atleast_1d(np.asarray(targets, dtype=float))
+    balance, residual = evaluate(df[QUANTITY_COLUMNS].to_numpy(dtype=float), _pci_vector(pci), targets)
+    cantons = df["Cantons"].astype(str).to_numpy()
+    return pd.DataFrame({
+        "target_pci": np.repeat(targets, len(cantons)),
+        "Cantons": np.tile(cantons, len(targets)),
+        BALANCE_COLUMN: balance.ravel(),
+        TOTAL_COLUMN: residual.sum(axis=2).ravel(),
+    })
@@ -0,0 +1,155 @@
+"""Surface de densité du potentiel pour l'implantation d'installations GHT.
+
+Les remettants géocodés sont rasterisés sur une grille fine couvrant la Suisse,
+chacun pesant son potentiel énergétique (mélange de flux pondéré au choix).
+Sans quantités déclarées par entreprise, ce potentiel est estimé en
+répartissant à parts égales la quantité du canton entre ses remettants (voir
+``utils.allocation.source_quantities``) : la surface reflète alors la
+répartition des remettants dans chaque canton, pas leurs volumes réels.
+La grille est lissée par un noyau gaussien, par convolution FFT : le coût ne
+dépend que de la taille de la grille, pas du nombre d'entreprises ni de la
+largeur du noyau. Les meilleurs emplacements candidats sont les maxima de la
+surface, séparés d'une distance minimale. Chaque surface est gardée en cache
+par (largeur de bande, mélange de flux, résolution).
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregation import FLOWS, MJ_PER_GWH, PCI_MJ_KG, QUANTITY_COLUMNS
+from utils.allocation import quantity_sources, source_quantities
+from utils.data import file_signature
+from utils.spatial import SWISS_BBOX
+
+# 📌 Paramètres par défaut de la surface
+RESOLUTION_KM = 1.0
+BANDWIDTH_KM = 10.0
+KM_PER_DEGREE = 111.32
+DEFAULT_MIX = {flow: 1.0 for flow in FLOWS}
+
+# Les longitudes sont comprimées par cos(latitude) au centre de l'emprise
+_LON_FACTOR = math.cos(math.radians((SWISS_BBOX[1] + SWISS_BBOX[3]) / 2))
+
+
+class DensitySurface:
+    """Grille de densité du potentiel (GWh par km²) et ses coordonnées."""
+
+    def __init__(self, density, bounds, resolution_km, bandwidth_km):
+        self.density = density
+        self.bounds = bounds  # (lon min, lat min, lon max, lat max)
+        self.resolution_km = resolution_km
+        self.bandwidth_km = bandwidth_km
+
+    @property
+    def shape(self):
+        return self.density.shape
+
+    def cell_centers(self, rows, cols):
+        """Latitude et longitude des centres des cellules ``(rows, cols)``."""
+        min_lng, min_lat, max_lng, max_lat = self.bounds
+        n_rows, n_cols = self.shape
+        lats = max_lat - (np.asarray(rows) + 0.5) * (max_lat - min_lat) / n_rows
+        lngs = min_lng + (np.asarray(cols) + 0.5) * (max_lng - min_lng) / n_cols
+        return lats, lngs
+
+    def candidates(self, n=10, min_distance_km=None):
+        """Les ``n`` meilleurs emplacements, séparés d'au moins ``min_distance_km`` (deux largeurs de bande par défaut)."""
+        min_distance_km = 2 * self.bandwidth_km if min_distance_km is None else min_distance_km
+        radius = min_distance_km / self.resolution_km
+        n_rows, n_cols = self.shape
+        rows_grid, cols_grid = np.ogrid[:n_rows, :n_cols]
+        remaining = self.density.copy()
+        picks = []
+        for _ in range(n):
+            index = int(np.argmax(remaining))
+            if remaining.flat[index] <= 0:
+                break
+            row, col = divmod(index, n_cols)
+            picks.append((row, col, self.density[row, col]))
+            # On écarte le voisinage du site retenu avant de chercher le suivant
+            remaining[(rows_grid - row) ** 2 + (cols_grid - col) ** 2 <= radius ** 2] = 0
+        rows, cols, values = (np.array(v) for v in zip(*picks)) if picks else (np.array([], dtype=int),) * 3
+        lats, lngs = self.cell_centers(rows, cols)
+        return pd.DataFrame({
+            "Rang": np.arange(1, len(picks) + 1),
+            "latitude": lats,
+            "longitude": lngs,
+            "Densité [GWh/km²]": values,
+        })
+
+    def rgba(self, colormap=None, max_alpha=200):
+        """Image RGBA (uint8) de la surface pour un ``ImageOverlay`` : transparente là où elle est nulle."""
+        import branca.colormap as cm
+
+        colormap = colormap or cm.linear.YlOrRd_09
+        peak = self.density.max()
+        scaled = np.sqrt(self.density / peak) if peak > 0 else np.zeros(self.shape)
+        lut = np.array([colormap.rgba_bytes_tuple(v) for v in np.linspace(0, 1, 256)], dtype=np.uint8)
+        image = lut[np.round(scaled * 255).astype(int)]
+        image[..., 3] = np.round(scaled * max_alpha).astype(np.uint8)
+        return image
+
+
+def _grid(resolution_km):
+    min_lng, min_lat, max_lng, max_lat = SWISS_BBOX
+    n_rows = int(math.ceil((max_lat - min_lat) * KM_PER_DEGREE / resolution_km))
+    n_cols = int(math.ceil((max_lng - min_lng) * KM_PER_DEGREE * _LON_FACTOR / resolution_km))
+    return n_rows, n_cols
+
+
+def rasterize(lats, lngs, weights, resolution_km=RESOLUTION_KM):
+    """Somme des poids par cellule de la grille (ligne 0 au nord)."""
+    min_lng, min_lat, max_lng, max_lat = SWISS_BBOX
+    n_rows, n_cols = _grid(resolution_km)
+    counts, _, _ = np.histogram2d(
+        np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float),
+        bins=(n_rows, n_cols), range=((min_lat, max_lat), (min_lng, max_lng)),
+        weights=np.asarray(weights, dtype=float),
+    )
+    return counts[::-1]
+
+
+def gaussian_smooth(grid, bandwidth_km, resolution_km=RESOLUTION_KM):
+    """Convolution de la grille par un noyau gaussien normalisé (FFT, bords à zéro)."""
+    sigma = bandwidth_km / resolution_km
+    half = int(math.ceil(3 * sigma))
+    offsets = np.arange(-half, half + 1)
+    kernel_1d = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel = np.outer(kernel_1d, kernel_1d)
+    kernel /= kernel.sum() * resolution_km ** 2  # densité par km²
+
+    # Remplissage à zéro pour une convolution linéaire (et non circulaire)
+    shape = (grid.shape[0] + kernel.shape[0] - 1, grid.shape[1] + kernel.shape[1] - 1)
+    spectrum = np.fft.rfft2(grid, shape) * np.fft.rfft2(kernel, shape)
+    full = np.fft.irfft2(spectrum, shape)
+    smoothed = full[half:half + grid.shape[0], half:half + grid.shape[1]]
+    return np.clip(smoothed, 0, None)
+
+
+def source_weights(mix=None):
+    """Potentiel (GWh) de chaque remettant pour un mélange de flux pondéré."""
+    mix = {**DEFAULT_MIX, **(mix or {})}
+    sources = source_quantities()
+    factors = np.array([mix[flow] * PCI_MJ_KG[flow] / MJ_PER_GWH for flow in FLOWS])
+    return sources, sources[QUANTITY_COLUMNS].to_numpy(dtype=float) @ factors
+
+
+def density_surface(bandwidth_km=BANDWIDTH_KM, mix=None, resolution_km=RESOLUTION_KM):
+    """Surface de densité du potentiel, en cache par jeu de paramètres."""
+    mix = {**DEFAULT_MIX, **(mix or {})}
+    signatures = tuple(file_signature(path) for path in quantity_sources())
+    return _cached_surface(
+        signatures, round(float(bandwidth_km), 6),
+        tuple((flow, round(float(mix[flow]), 6)) for flow in FLOWS), round(float(resolution_km), 6),
+    )
+
+
+@lru_cache(maxsize=32)
+def _cached_surface(signatures, bandwidth_km, mix, resolution_km):
+    sources, weights = source_weights(dict(mix))
+    grid = rasterize(sources["latitude"], sources["longitude"], weights, resolution_km)
+    density = gaussian_smooth(grid, bandwidth_km, resolution_km)
+    density.setflags(write=False)
+    return DensitySurface(density, SWISS_BBOX, resolution_km, bandwidth_km)
@@ -0,0 +1,107 @@
+"""Recherche du canton contenant un point (clic sur la carte, géocodage).
+
+Les géométries des cantons sont indexées une fois par processus dans un
+``STRtree`` : un clic ne parcourt plus tous les MultiPolygon.
+"""
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from utils.data import CANTONS_GEOJSON, cached_resource, load_cantons
+
+# Tolérance pour capter les clics proches des limites (environ 1 km en degrés)
+BUFFER_RADIUS = 0.01
+
+# Rayon moyen de la Terre (km), pour les distances à vol d'oiseau
+EARTH_RADIUS_KM = 6371.0088
+
+# 📌 Emprise de la Suisse (lon min, lat min, lon max, lat max), avec une petite marge
+SWISS_BBOX = (5.9, 45.8, 10.55, 47.85)
+
+
+def in_swiss_bbox(lats, lngs):
+    """Masque vectorisé des coordonnées situées dans l'emprise de la Suisse."""
+    min_lng, min_lat, max_lng, max_lat = SWISS_BBOX
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    return (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distance à vol d'oiseau (km) entre des points, avec diffusion NumPy des formes."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_matrix(lats_a, lngs_a, lats_b, lngs_b):
+    """Matrice ``(len(a), len(b))`` des distances (km) entre deux ensembles de points."""
+    return haversine_km(
+        np.asarray(lats_a, dtype=float)[:, None], np.asarray(lngs_a, dtype=float)[:, None],
+        np.asarray(lats_b, dtype=float)[None, :], np.asarray(lngs_b, dtype=float)[None, :],
+    )
+
+
+class CantonLocator:
+    """Index spatial des cantons.
+
+    Aux frontières (point sur une limite commune), le canton retenu est celui
+    dont l'identifiant vient en premier dans l'ordre alphabétique, pour que le
+    résultat ne dépende pas de l'ordre des géométries dans le fichier.
+    """
+
+    def __init__(self, gdf, tolerance=BUFFER_RADIUS):
+        self.ids = gdf["id"].to_numpy(dtype=object)
+        self.geometries = gdf.geometry.to_numpy()
+        self.tolerance = tolerance
+        self.tree = STRtree(self.geometries)
+        # Rang alphabétique de chaque canton, utilisé pour départager les égalités
+        self._rank = np.argsort(np.argsort(self.ids.astype(str)))
+        shapely.prepare(self.geometries)
+
+    def locate(self, lat, lng):
+        """Identifiant du canton contenant (lat, lng), ou ``None``."""
+        return self.locate_many([lat], [lng])[0]
+
+    def locate_many(self, lats, lngs):
+        """Version vectorisée de :meth:`locate` pour des tableaux de coordonnées."""
+        points = shapely.points(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+        n = len(points)
+        best = np.full(n, -1, dtype=np.int64)
+
+        # 1) Points à l'intérieur (ou sur la limite) d'un canton
+        point_idx, tree_idx = self.tree.query(points, predicate="intersects")
+        self._assign(best, point_idx, tree_idx)
+
+        # 2) Clics juste à côté d'une limite : canton le plus proche dans la tolérance
+        missing = np.flatnonzero(best < 0)
+        if len(missing) and self.tolerance:
+            near_idx, tree_idx = self.tree.query_nearest(
+                points[missing], max_distance=self.tolerance, all_matches=True
+            )
+            self._assign(best, missing[near_idx], tree_idx)
+
+        result = np.full(n, None, dtype=object)
+        found = best >= 0
+        result[found] = self.ids[best[found]]
+        return result
+
+    def _assign(self, best, point_idx, tree_idx):
+        """Retient pour chaque point le candidat de plus petit rang alphabétique."""
+        if not len(point_idx):
+            return
+        order = np.lexsort((self._rank[tree_idx], point_idx))
+        point_idx, tree_idx = point_idx[order], tree_idx[order]
+        first = np.ones(len(point_idx), dtype=bool)
+        first[1:] = point_idx[1:] != point_idx[:-1]
+        best[point_idx[first]] = tree_idx[first]
+
+
+def get_canton_locator():
+    """Index des cantons partagé par le processus (reconstruit si le fichier change)."""
+    return cached_resource("canton_locator", CANTONS_GEOJSON, lambda path: CantonLocator(load_cantons()))
+
+
+def locate_canton(lat, lng):
+    """Identifiant du canton contenant (lat, lng), ou ``None`` hors de Suisse."""
+    return get_canton_locator().locate(lat, lng)
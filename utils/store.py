@@ -0,0 +1,172 @@
+"""Stockage colonnaire (Arrow/Feather) des fichiers sources normalisés.
+
+Les CSV à séparateur « ; » et virgule décimale sont lents à lire (moteur
+``python`` de pandas, conversions colonne par colonne). Chaque source est donc
+normalisée une seule fois, avec un schéma de types fixe, dans un fichier
+Feather non compressé de ``data/store/``. Ce format se relit sans aucun
+décodage de texte. La conversion en DataFrame (``to_pandas``) copie toutefois
+les colonnes : chaque processus garde sa propre copie en mémoire, le gain
+porte sur le temps de lecture, pas sur la mémoire partagée.
+
+Le nom du fichier contient la taille et le mtime de la source ainsi qu'une
+empreinte de son schéma : un fichier modifié dans ``data/`` ou un schéma
+changé produit une nouvelle version au chargement suivant.
+Les partitions annuelles (``data/years/<année>/``) ont chacune leurs versions,
+préfixées par leur chemin : ajouter une année n'en réécrit aucune autre.
+
+Pour reconstruire le store à la main :
+
+    python -m utils.store
+"""
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+STORE_DIR = DATA_DIR / "store"
+
+# 📌 Schéma de types appliqué à chaque source avant écriture
+# (types « nullables », avec majuscule, pour les colonnes qui peuvent manquer)
+SCHEMAS = {
+    "Companies_geocoded_all_unique_corrected.csv": {
+        "OMoD": "int64",
+        "Companies": "string",
+        "Cantons": "category",
+        "Zip_codes": "Int32",
+        "Cities": "string",
+        "Streets": "string",
+        "Group": "category",
+        "latitude": "float64",
+        "longitude": "float64",
+    },
+    "Potentiel_Ener_Tot_GWh.csv": {
+        "Cantons": "object",
+        "kan_code": "int16",
+        **{f"Quantities_{flow} [Kg]": "int64" for flow in ["01", "04", "08", "11"]},
+        **{f"Pot_Ener_{flow} [GWh]": "float64" for flow in ["01", "04", "08", "11"]},
+        "Pot_Ener [GWh]": "float64",
+    },
+    "Potentiel_Ener_Res_GWh.csv": {
+        "Cantons": "object",
+        **{f"Quantities_{flow} [Kg]": "int64" for flow in ["01", "04", "08", "11"]},
+        **{f"Pot_Ener_{flow} [GWh]": "float64" for flow in ["01", "04", "08", "11"]},
+        "Pot_Ener [GWh]": "float64",
+    },
+    "Balances_Ener_01_04.csv": {
+        "Cantons": "object",
+        "Balance_Ener [MJ]": "float64",
+        "Balance_Ener [GWh]": "float64",
+    },
+    "Companies_quantities.csv": {
+        "OMoD": "int64",
+        **{f"Quantities_{flow} [Kg]": "float64" for flow in ["01", "04", "08", "11"]},
+    },
+    "cantons.geojson": {"id": "object", "name": "object"},
+}
+
+
+def _store_stem(source):
+    """Préfixe des versions de ``source`` : le chemin relatif à ``data/`` (``years__2023__…``)."""
+    source = Path(source).resolve()
+    try:
+        parts = source.relative_to(DATA_DIR).with_suffix("").parts
+    except ValueError:
+        parts = (source.stem,)
+    return "__".join(parts)
+
+
+def _schema_tag(source):
+    schema = json.dumps(SCHEMAS.get(Path(source).name, {}), sort_keys=True)
+    return hashlib.sha1(schema.encode("utf-8")).hexdigest()[:8]
+
+
+def store_path(source):
+    """Fichier Feather correspondant à l'état actuel de ``source`` et à son schéma."""
+    stat = os.stat(source)
+    return STORE_DIR / f"{_store_stem(source)}.{stat.st_size}-{stat.st_mtime_ns}-{_schema_tag(source)}.feather"
+
+
+def apply_schema(df, source):
+    """Convertit les colonnes connues de ``source`` vers les types du schéma."""
+    schema = SCHEMAS.get(Path(source).name, {})
+    return df.astype({col: dtype for col, dtype in schema.items() if col in df.columns})
+
+
+def _is_geo(df):
+    return hasattr(df, "geometry") and "geometry" in df.columns
+
+
+def read_store(source, geo=False):
+    """DataFrame normalisé de ``source`` s'il est à jour dans le store, sinon ``None``."""
+    path = store_path(source)
+    if not path.exists():
+        return None
+    if geo:
+        import geopandas as gpd
+
+        return gpd.read_feather(path)
+    from pyarrow import feather
+
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def write_store(df, source):
+    """Écrit ``df`` dans le store (écriture atomique) et supprime les anciennes versions."""
+    path = store_path(source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if _is_geo(df):
+        df.to_feather(tmp, compression="uncompressed")
+    else:
+        from pyarrow import feather
+
+        feather.write_feather(df, tmp, compression="uncompressed")
+    tmp.replace(path)
+    for old in path.parent.glob(f"{_store_stem(source)}.*.feather"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
+
+def load_or_build(source, parser, geo=False):
+    """Lit ``source`` depuis le store, ou le parse et le normalise s'il n'y est pas encore."""
+    df = read_store(source, geo=geo)
+    if df is not None:
+        return df
+    df = apply_schema(parser(source), source)
+    try:
+        write_store(df, source)
+    except OSError:
+        # Répertoire en lecture seule (déploiement) : on garde simplement la version parsée
+        pass
+    return df
+
+
+def build_all():
+    """(Re)construit le store pour toutes les sources présentes dans ``data/``."""
+    from utils import data
+
+    loaders = [
+        data.load_companies,
+        data.load_potentiel_total,
+        data.load_potentiel_residuel,
+        data.load_balance,
+        data.load_cantons,
+    ]
+    if data.COMPANY_QUANTITIES_CSV.exists():
+        loaders.append(data.load_company_quantities)
+    for loader in loaders:
+        loader()
+    # Partitions annuelles : seules les nouvelles ou modifiées sont parsées
+    for name in data.DATASETS:
+        for year in data.available_years(name):
+            data.load_dataset(name, year)
+    return sorted(STORE_DIR.glob("*.feather"))
+
+
+if __name__ == "__main__":
+    for path in build_all():
+        print(f"✅ {path.relative_to(DATA_DIR.parent)}", file=sys.stdout)
@@ -0,0 +1,131 @@
+"""Résumés par canton précalculés pour les panneaux latéraux des pages.
+
+Au chargement des données, on construit une fois pour toutes un dictionnaire
+indexé par code de canton : potentiels par flux, total et classe de balance.
+Sélectionner un canton devient une simple lecture dans ce dictionnaire. Le
+graphique en anneau (spécification Plotly JSON) n'est construit qu'au premier
+affichage du canton, puis gardé dans son résumé : Plotly n'est importé que
+lorsqu'un graphique est réellement demandé.
+
+Aux paramètres de référence, les résumés sont ceux des fichiers fournis
+(un jeu par fichier, reconstruit seulement s'il change). Hors référence, ils
+viennent du modèle de mélange (``utils.scenario``) : un jeu par scénario,
+gardé en cache.
+"""
+import json
+from functools import lru_cache
+
+from utils.classification import balance_class
+from utils.data import cached_resource, dataset_path, file_signature, load_cantons, load_dataset
+from utils.scenario import TARGET_PCI, is_reference, run_scenario, scenario_key, scenario_sources
+
+# 📌 Libellés des flux du chap. 07 de l'OMoD
+FLOW_LABELS = {
+    "Pot_Ener_01 [GWh]": "Eaux solvantées",
+    "Pot_Ener_04 [GWh]": "Solvants usagés",
+    "Pot_Ener_08 [GWh]": "Boues industrielles",
+    "Pot_Ener_11 [GWh]": "Émulsions",
+}
+
+
+def pie_figure_spec(energy_values, canton):
+    """Spécification JSON du graphique de composition du potentiel d'un canton."""
+    import plotly.express as px
+
+    fig = px.pie(
+        names=list(energy_values.keys()),
+        values=list(energy_values.values()),
+        title=f"Composition du Potentiel Énergétique de {canton}",
+        hole=0.3
+    )
+    # Ajuster le layout pour laisser de l'espace pour le titre
+    fig.update_layout(
+        title={'y': 0.95, 'x': 0.5, 'xanchor': 'center', 'yanchor': 'top'},
+        margin=dict(t=100, b=50, l=50, r=50)
+    )
+    fig.update_traces(textinfo="percent+label", hoverinfo="label+value")
+    return json.loads(fig.to_json())
+
+
+def build_potential_summaries(df_potentiel):
+    """Résumé de chaque canton d'un fichier de potentiel : flux et total (graphique via ``summary_figure``)."""
+    summaries = {}
+    for record in df_potentiel.to_dict("records"):
+        canton = str(record["Cantons"])
+        energy_values = {label: float(record[col]) for col, label in FLOW_LABELS.items()}
+        summaries[canton] = {
+            "canton": canton,
+            "flows": energy_values,
+            "total": sum(energy_values.values()),
+        }
+    return summaries
+
+
+def summary_figure(summary):
+    """Graphique du résumé d'un canton, construit au premier appel puis réutilisé."""
+    figure = summary.get("figure")
+    if figure is None:
+        figure = summary["figure"] = pie_figure_spec(summary["flows"], summary["canton"])
+    return figure
+
+
+def build_balance_summaries(gdf, df_balance):
+    """Balance et classe de chaque canton de la carte (NaN sans installation d'incinération)."""
+    balances = gdf[["id"]].merge(
+        df_balance[["Cantons", "Balance_Ener [GWh]"]], left_on="id", right_on="Cantons", how="left"
+    )
+    classes = balance_class(balances["Balance_Ener [GWh]"])
+    return {
+        canton: {"canton": canton, "balance": float(balance), "classe": classe}
+        for canton, balance, classe in zip(balances["id"], balances["Balance_Ener [GWh]"], classes)
+    }
+
+
+@lru_cache(maxsize=64)
+def _cached_summaries(signatures, target_pci, pci, year):
+    frames = run_scenario(target_pci, dict(pci), year)
+    return {
+        "total": build_potential_summaries(frames["total"]),
+        "residuel": build_potential_summaries(frames["residuel"]),
+        "balance": build_balance_summaries(load_cantons(), frames["balance"]),
+    }
+
+
+def get_scenario_summaries(target_pci=TARGET_PCI, pci=None, year=None):
+    """Résumés ``total``, ``residuel`` et ``balance`` : fichiers fournis, ou scénario hors référence.
+
+    Avec ``year``, les résumés viennent de la partition annuelle (vides si elle manque).
+    """
+    if is_reference(target_pci, pci):
+        return {
+            "total": get_potential_summaries("total", year),
+            "residuel": get_potential_summaries("residuel", year),
+            "balance": get_balance_summaries(year),
+        }
+    if not dataset_path("total", year).exists():
+        return {"total": {}, "residuel": {}, "balance": {}}
+    signatures = tuple(file_signature(path) for path in scenario_sources(year))
+    return _cached_summaries(signatures, *scenario_key(target_pci, pci), year)
+
+
+def get_potential_summaries(dataset="total", year=None):
+    """Résumés des potentiels (``"total"`` ou ``"residuel"``) du fichier fourni, construits une fois par processus.
+
+    Avec ``year``, les résumés viennent de la partition annuelle (vides si elle manque).
+    """
+    path = dataset_path(dataset, year)
+    if not path.exists():
+        return {}
+    return cached_resource(
+        f"summary:{dataset}:{year}", path, lambda _: build_potential_summaries(load_dataset(dataset, year))
+    )
+
+
+def get_balance_summaries(year=None):
+    """Résumés de la balance énergétique par canton du fichier fourni, construits une fois par processus."""
+    path = dataset_path("balance", year)
+    if not path.exists():
+        return {}
+    return cached_resource(
+        f"summary:balance:{year}", path, lambda _: build_balance_summaries(load_cantons(), load_dataset("balance", year))
+    )
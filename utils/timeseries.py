@@ -0,0 +1,65 @@
+"""Séries annuelles par canton, lues partition par partition.
+
+Chaque année est une partition ``data/years/<année>/`` (voir
+``utils.data.available_years``). La valeur d'un indicateur par canton est
+lue année par année et gardée (``cached_resource``) avec la signature
+des fichiers de sa partition : quand une année est ajoutée ou corrigée, seule
+cette partition est relue, l'historique déjà lu est réutilisé tel quel.
+"""
+import pandas as pd
+
+from utils.aggregation import TOTAL_COLUMN
+from utils.data import available_years, cached_resource, dataset_path, load_dataset
+
+# 📌 Indicateur suivi pour chaque jeu de données
+SERIES_COLUMNS = {
+    "total": TOTAL_COLUMN,
+    "residuel": TOTAL_COLUMN,
+    "balance": "Balance_Ener [GWh]",
+}
+
+
+def canton_series(name):
+    """Valeur de l'indicateur ``name`` par canton et par année (format long), depuis les fichiers fournis."""
+    column = SERIES_COLUMNS[name]
+    frames = [
+        cached_resource(
+            f"series:{name}:{year}", dataset_path(name, year),
+            lambda _, year=year: load_dataset(name, year)[["Cantons", column]].assign(year=year),
+        )
+        for year in available_years(name)
+    ]
+    if not frames:
+        return pd.DataFrame(columns=["Cantons", column, "year"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def animated_choropleth(name, geojson):
+    """Choroplèthe Plotly animée par année pour le jeu ``name``.
+
+    L'échelle de couleurs est fixée sur toute la série pour que les années
+    restent comparables d'une image à l'autre.
+    """
+    import plotly.express as px
+
+    column = SERIES_COLUMNS[name]
+    series = canton_series(name).sort_values(["year", "Cantons"])
+    low, high = series[column].min(), series[column].max()
+    if name == "balance":
+        bound = max(abs(low), abs(high))
+        color_scale, color_range = "RdBu", (-bound, bound)
+    else:
+        color_scale, color_range = "YlOrRd", (0, high)
+    fig = px.choropleth(
+        series,
+        geojson=geojson,
+        locations="Cantons",
+        featureidkey="properties.id",
+        color=column,
+        animation_frame="year",
+        color_continuous_scale=color_scale,
+        range_color=color_range,
+    )
+    fig.update_geos(fitbounds="locations", visible=False)
+    fig.update_layout(margin=dict(t=30, b=0, l=0, r=0), height=550)
+    return fig
@@ -0,0 +1,75 @@
+"""Préchauffage d'un processus serveur avant la première session.
+
+Les pages importent la pile géographique (GeoPandas, Shapely, SciPy, Folium,
+streamlit-folium) et lisent les mêmes jeux de données partagés. Sans
+préchauffage, c'est la première navigation vers une carte qui paie ces
+imports et ces lectures. ``warm_up()`` les fait une fois par processus :
+les modules restent dans ``sys.modules`` et les données dans le cache de
+``utils.data``, que toutes les sessions réutilisent ensuite. Il construit
+aussi les cartes des entreprises (tous les cantons × combinaisons de
+groupes), lues depuis le cache disque après le premier démarrage.
+
+Le préchauffage s'exécute avant l'écoute du port (voir ``run_app.py``) et
+dans le thread principal : importer les mêmes bibliothèques depuis deux
+threads à la fois (préchauffage et démarrage de Streamlit) peut exposer des
+modules à moitié initialisés.
+"""
+import importlib
+import time
+
+# 📌 Modules lourds importés par les pages (Plotly en dernier : seulement pour les graphiques)
+HEAVY_MODULES = [
+    "pandas",
+    "shapely",
+    "geopandas",
+    "pyarrow.feather",
+    "scipy.spatial",
+    "branca.colormap",
+    "folium",
+    "streamlit_folium",
+    "plotly.express",
+]
+
+# 📌 Zoom initial des cartes choroplèthes (voir ``utils.geometry.level_for_zoom``)
+ZOOM_START = 8
+
+
+def import_stack():
+    """Importe la pile géographique et graphique."""
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+
+def load_shared():
+    """Lit les jeux de données partagés et construit les index et géométries en cache."""
+    from utils.data import load_cantons, load_companies, load_dataset
+    from utils.geometry import cantons_topojson, level_for_zoom
+    from utils.spatial import get_canton_locator
+    from utils.summary import get_balance_summaries, get_potential_summaries
+
+    load_companies()
+    load_cantons()
+    for name in ("total", "residuel", "balance"):
+        load_dataset(name)
+    cantons_topojson(level_for_zoom(ZOOM_START))
+    get_canton_locator()
+    get_potential_summaries("total")
+    get_potential_summaries("residuel")
+    get_balance_summaries()
+
+
+def prewarm_maps():
+    """Met en cache les cartes des entreprises de la page 1."""
+    from utils.maps import prewarm_companies_maps
+
+    prewarm_companies_maps()
+
+
+def warm_up():
+    """Préchauffe le processus ; retourne la durée (s) de chaque étape."""
+    timings = {}
+    for name, step in (("imports", import_stack), ("données", load_shared), ("cartes", prewarm_maps)):
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+    return timings